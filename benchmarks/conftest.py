@@ -0,0 +1,122 @@
+# Fixtures for the benchmark suite, which requires pytest-benchmark
+#
+# Run from the repository root with
+#
+#     $ python -m pytest benchmarks
+import importlib.util
+import os
+import pytest
+import yaml
+from qintervals.clock import VirtualClock, to_ns
+from qintervals.workout import Workout
+
+# Skip the benchmarks rather than fail if pytest-benchmark is not installed
+if importlib.util.find_spec('pytest_benchmark') is None:
+    collect_ignore_glob = ['test_*.py']
+
+# Render widgets without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# Redraw timer period
+STEP = 0.05
+
+
+def _interval(i):
+    return {
+        'type': ['work', 'rest'][i % 2],
+        'name': 'Interval {}'.format(i),
+        'length': '{}s'.format(15 + i % 4 * 15)
+    }
+
+
+# A long workout without any blocks
+def flat_workout(n=10000):
+    return {
+        'title': 'Flat',
+        'intervals': [_interval(i) for i in range(n)]
+    }
+
+
+# A workout of blocks nested depth levels deep, each level holding a few
+# intervals and the next level
+def nested_workout(depth=8, repeats=3):
+    entry = _interval(0)
+    for level in range(depth):
+        entry = {
+            'block': {
+                'repeats': repeats,
+                'skip_last_rest': True,
+                'intervals': [_interval(level), entry, _interval(level+1)]
+            }
+        }
+    return {
+        'title': 'Nested',
+        'intervals': [_interval(0), entry, _interval(1)]
+    }
+
+
+# A short file describing a very large number of intervals
+def huge_repeat_workout(repeats=1000000):
+    return {
+        'title': 'Huge repeat',
+        'intervals': [{
+            'block': {
+                'repeats': repeats,
+                'intervals': [_interval(0), _interval(1)]
+            }
+        }]
+    }
+
+
+SHAPES = {
+    'flat': flat_workout,
+    'nested': nested_workout,
+    'huge_repeat': huge_repeat_workout
+}
+
+
+# Clock which advances by one redraw period each time it is read, returning
+# to the start at the end of the workout so that the workout never finishes
+class LoopingClock(VirtualClock):
+    def __init__(self, period, step=STEP):
+        super().__init__()
+        self.period = to_ns(period)
+        self.step = to_ns(step)
+
+    def now(self):
+        time = self.time
+        self.time = (time + self.step) % self.period
+        return time
+
+
+@pytest.fixture(scope='session', params=sorted(SHAPES))
+def workout_dict(request):
+    return SHAPES[request.param]()
+
+
+@pytest.fixture(scope='session')
+def workout_file(workout_dict, tmp_path_factory):
+    yaml_file = str(tmp_path_factory.mktemp('workouts') / 'workout.yml')
+    with open(yaml_file, 'w') as stream:
+        yaml.safe_dump(workout_dict, stream)
+    return yaml_file
+
+
+# A running workout whose clock moves forward on every read
+@pytest.fixture()
+def running_workout(workout_dict):
+    workout = Workout(clock=VirtualClock())
+    workout.from_yaml(workout_dict)
+    workout.clock = LoopingClock(workout.total_time)
+    workout.stop()
+    workout.start()
+    return workout
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication(['qintervals'])
+    return app
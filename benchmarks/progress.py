@@ -0,0 +1,53 @@
+# Measure the cost of a single Workout.progress call, one redraw tick, for
+# workouts of increasing length
+#
+# Run from the repository root with
+#
+#     $ python -m benchmarks.progress
+from time import perf_counter_ns
+from qintervals.clock import VirtualClock, to_ns
+from qintervals.interval import Interval, IntervalType
+from qintervals.workout import Workout
+
+SIZES = [10, 1000, 100000, 1000000]
+MAX_TICKS = 100000
+# Redraw timer period
+STEP = 0.05
+
+
+# Clock which advances by one redraw period each time it is read
+class SteppingClock(VirtualClock):
+    def now(self):
+        self.time += to_ns(STEP)
+        return self.time
+
+
+# Build a flat workout of n one second intervals
+def make_workout(n):
+    workout = Workout(clock=SteppingClock())
+    for i in range(n):
+        interval_type = IntervalType.work if i % 2 else IntervalType.rest
+        workout.add_interval(Interval(interval_type, 'Interval', '1s'))
+    return workout
+
+
+def main():
+    print('{:>10} {:>10}'.format('intervals', 'ns/tick'))
+    for n in SIZES:
+        workout = make_workout(n)
+        workout.start()
+
+        # Stop short of the end of the workout
+        ticks = min(MAX_TICKS, int(workout.total_time/STEP) - 1)
+
+        progress = workout.progress
+        begin = perf_counter_ns()
+        for _ in range(ticks):
+            progress()
+        end = perf_counter_ns()
+
+        print('{:>10} {:>10.0f}'.format(n, (end-begin)/ticks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+from qintervals.interval import Interval, IntervalType
+from qintervals.workout import Workout
+
+
+def test_from_yaml(benchmark, workout_file):
+    workout = benchmark(Workout, workout_file)
+
+    assert len(workout.intervals) > 0
+
+
+def test_unpack(benchmark, workout_dict):
+    workout = Workout()
+    entries = workout_dict['intervals']
+
+    def unpack():
+        return [workout._unpack(entry) for entry in entries]
+
+    assert len(benchmark(unpack)) == len(entries)
+
+
+def test_add_interval(benchmark):
+    intervals = [Interval(IntervalType.work, 'Interval', '15s')
+                 for _ in range(10000)]
+
+    def add_intervals():
+        workout = Workout()
+        for interval in intervals:
+            workout.add_interval(interval)
+        return workout
+
+    assert len(benchmark(add_intervals).intervals) == len(intervals)
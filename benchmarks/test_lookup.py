@@ -0,0 +1,30 @@
+# Lookups made on each frame while a workout is running, the workout clock
+# moves forward by one redraw period on every call
+from itertools import cycle
+
+
+def test_current_interval(benchmark, running_workout):
+    assert benchmark(running_workout.current_interval) is not None
+
+
+def test_progress(benchmark, running_workout):
+    assert benchmark(running_workout.progress).interval is not None
+
+
+def test_upcoming(benchmark, running_workout):
+    # As many intervals as the ui displays
+    assert len(benchmark(running_workout.upcoming, limit=8)) <= 8
+
+
+def test_seek(benchmark, running_workout):
+    # Spread seeks across the whole workout
+    times = cycle([running_workout.total_time*i/997 for i in range(997)])
+
+    def seek():
+        running_workout.seek(next(times))
+
+    benchmark(seek)
+
+
+def test_skip_interval(benchmark, running_workout):
+    benchmark(running_workout.skip_interval, 1)
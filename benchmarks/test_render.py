@@ -0,0 +1,18 @@
+from itertools import cycle
+
+
+def test_count_down_paint(benchmark, qapp):
+    from qintervals.gui import CountDown
+    count_down = CountDown(None)
+    count_down.resize(300, 300)
+
+    # Arc positions of successive frames of a ten second interval in a ten
+    # minute workout
+    frames = cycle([(t, 600-t, t % 10, 10 - t % 10)
+                    for t in (i/20 for i in range(20*600))])
+
+    def frame():
+        count_down.update_times(*next(frames))
+        return count_down.grab()
+
+    assert not benchmark(frame).isNull()
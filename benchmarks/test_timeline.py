@@ -0,0 +1,22 @@
+# Sampling a whole workout as a timeline, at as many samples as a six hour
+# workout has at one sample a second
+import pytest
+from qintervals import timeline
+from qintervals.workout import Workout
+
+SAMPLES = 6*60*60
+
+
+@pytest.mark.parametrize('use_numpy', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        timeline.numpy is None, reason='NumPy is not installed'))
+], ids=['array', 'numpy'])
+def test_timeline(benchmark, workout_dict, use_numpy):
+    workout = Workout()
+    workout.from_yaml(workout_dict)
+    resolution = workout.total_time / SAMPLES
+
+    result = benchmark(timeline.timeline, workout.schedule, resolution,
+                       use_numpy)
+    assert len(result.index) == SAMPLES
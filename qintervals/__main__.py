@@ -1,33 +1,493 @@
 import argparse
+import json
 import os
-from PyQt5 import QtWidgets
-from qintervals.workout import Workout
-from qintervals.gui import Ui
+from qintervals import cache
+from qintervals.interval import IntervalType
+from qintervals.workout import Workout, WORKOUT_ERRORS, describe_error
+import signal
+import socket
 import sys
+from time import perf_counter
+
+
+# Command run when the first argument is not a command
+DEFAULT_COMMAND = 'show'
 
 
 def main():
+    startup = StartupProfile()
+    clargs, qt_args = parse_args()
+    startup.mark('parse arguments')
+
+    try:
+        if clargs.main is ui_main:
+            status = ui_main(clargs, qt_args, startup)
+        else:
+            status = clargs.main(clargs)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Standard output was closed early, as when piped to head. Point it
+        # at devnull so that flushing it on exit does not fail again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        status = 1
+    sys.exit(status)
+
+
+# Show a workout, returns the exit status
+def ui_main(clargs, qt_args, startup=None):
+    if startup is None:
+        startup = StartupProfile()
+    if clargs.command == 'library':
+        clargs.workout = library_path(clargs)
+
+    # Create workout object, from the compiled workout cache unless disabled
+    loading = None
+    try:
+        if clargs.stream:
+            # Read only the first interval or block before showing the window
+            workout = Workout()
+            loading = workout.iter_yaml(clargs.workout)
+            next(loading, None)
+        elif clargs.no_cache:
+            workout = Workout(clargs.workout)
+        else:
+            workout = cache.load(clargs.workout)
+    except WORKOUT_ERRORS as error:
+        sys.exit('qintervals: error: {}'.format(describe_error(error)))
+    startup.mark('load workout')
+
+    # Qt is only loaded once the workout is known to be valid
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
+    from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: F401
+    startup.mark('import Qt')
+    from qintervals.gui import Ui
+    startup.mark('import gui')
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    startup.mark('create application')
+
+    if clargs.stats:
+        from qintervals.gui import FRAME_PHASES
+        from qintervals.stats import FrameStats
+        stats = FrameStats(FRAME_PHASES)
+
+        # Report on demand when sent SIGUSR1
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda *args: stats.report())
+            wakeup = wake_on_signals(app)  # noqa: F841
+    else:
+        stats = None
+
+    telemetry = receiver = None
+    if clargs.telemetry_port is not None or clargs.telemetry_socket:
+        from qintervals.telemetry import Receiver, Telemetry
+        telemetry = Telemetry(workout)
+        try:
+            receiver = Receiver(telemetry, clargs.telemetry_port,
+                                clargs.telemetry_socket)
+        except OSError as error:
+            sys.exit('qintervals: error: telemetry: {}'.format(error))
+        receiver.start()
+
+    ui = Ui(workout, stats=stats, telemetry=telemetry)
+    startup.mark('create window')
+
+    if loading is not None:
+        ui.load_remaining(loading)
+
+    if clargs.profile_startup:
+        # Report once the event loop has drawn the window
+        def report():
+            startup.mark('first frame')
+            startup.report()
+        ui.first_frame.connect(report)
+
+    status = app.exec_()
+
+    if stats is not None:
+        stats.report()
+
+    if receiver is not None:
+        receiver.stop()
+        telemetry.write_summary()
+
+    if clargs.probe_audio:
+        count, mean, largest = ui.audio.latency()
+        print('{} sound cues, timing error mean {:.2f} ms, max {:.2f} ms'
+              .format(count, mean, largest), file=sys.stderr)
+
+    return status
+
+
+# Wake the Qt event loop when a signal arrives
+#
+# Python signal handlers only run between Python bytecodes and the event loop
+# runs no Python code while the workout is not running, so the signal number
+# is written to a socket watched by the event loop. Returns the objects which
+# must be kept alive.
+def wake_on_signals(parent):
+    from PyQt5 import QtCore
+
+    receiver, sender = socket.socketpair()
+    receiver.setblocking(False)
+    sender.setblocking(False)
+    signal.set_wakeup_fd(sender.fileno(), warn_on_full_buffer=False)
+
+    notifier = QtCore.QSocketNotifier(receiver.fileno(),
+                                      QtCore.QSocketNotifier.Read, parent)
+    # Reading the socket runs Python code, which runs the signal handlers
+    notifier.activated.connect(lambda: receiver.recv(64))
+    return receiver, sender, notifier
+
+
+# Parse the command line, or argv if given. Returns the arguments and the
+# unrecognised arguments which are passed to Qt. The first argument names a
+# command, the workout is shown if it does not.
+def parse_args(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser, commands = build_parser()
+    if not argv or (argv[0] not in commands
+                    and argv[0] not in ('-h', '--help')):
+        argv = [DEFAULT_COMMAND] + argv
+
+    clargs, qt_args = parser.parse_known_args(argv)
+    # Qt's own options start with a single dash, other unknown options are
+    # mistakes, as are unknown arguments to commands without a window
+    if clargs.main is ui_main:
+        unknown = [arg for arg in qt_args if arg.startswith('--')]
+    else:
+        unknown = qt_args
+    if unknown:
+        parser.error('unrecognized arguments: {}'.format(' '.join(unknown)))
+    return clargs, qt_args
+
+
+# Parser of the command line and its commands by name
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='qintervals', description='Interval training timer, shows a'
+        ' workout unless a command is given')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    # Options of the commands which show a workout
+    ui = argparse.ArgumentParser(add_help=False)
+    ui.add_argument('--no-cache', action='store_true',
+                    help='always parse the workout file, ignoring the'
+                    ' compiled workout cache')
+    ui.add_argument('--stream', action='store_true',
+                    help='show the workout while the rest of the file is'
+                    ' read, for very large workout files')
+    ui.add_argument('--stats', action='store_true',
+                    help='print frame timing statistics on exit, or when'
+                    ' sent SIGUSR1')
+    ui.add_argument('--probe-audio', action='store_true',
+                    help='print the timing error of sound cues on exit')
+    ui.add_argument('--profile-startup', action='store_true',
+                    help='print the time taken by each stage of start up')
+    ui.add_argument('--telemetry-port', type=int, default=None,
+                    help='receive sensor samples on this UDP port of the'
+                    ' loopback interface, a summary of each interval is'
+                    ' printed on exit')
+    ui.add_argument('--telemetry-socket', type=str, default=None,
+                    help='receive sensor samples on this unix datagram'
+                    ' socket')
+
+    show = subparsers.add_parser(
+        DEFAULT_COMMAND, parents=[ui], help='show a workout, the default'
+        ' command', description='Show a workout, other arguments are passed'
+        ' to Qt')
+    show.add_argument('workout', type=str, action='store',
+                      help='YAML workout file to read')
+    show.set_defaults(main=ui_main)
+
+    _add_batch_commands(subparsers)
+    _add_server_commands(subparsers)
+    _add_sensors_command(subparsers)
+    _add_timeline_command(subparsers)
+    _add_library_command(subparsers, ui)
+    return parser, subparsers.choices
+
+
+def _add_batch_commands(subparsers):
+    validate = subparsers.add_parser(
+        'validate', help='check and summarise workout files',
+        description='Validate and summarise workout files as JSON lines')
+    compile = subparsers.add_parser(
+        'compile', help='check, summarise and cache compiled workout files',
+        description='Validate, summarise and compile workout files, writing'
+        ' a summary of each as JSON lines')
+    compile.add_argument('--cache-dir', type=str, default=None,
+                         help='directory to write compiled workouts to')
+
+    for subparser in (validate, compile):
+        subparser.add_argument('paths', type=str, nargs='+',
+                               help='workout files or directories to search'
+                               ' for workout files')
+        subparser.add_argument('-j', '--jobs', type=int, default=None,
+                               help='number of worker processes, defaults to'
+                               ' the number of CPUs')
+        subparser.add_argument('--chunksize', type=int, default=None,
+                               help='number of files sent to a worker at a'
+                               ' time')
+        subparser.set_defaults(main=batch_main)
+
+
+# Validate or compile many workout files, returns the exit status
+def batch_main(clargs):
+    from qintervals import batch
+
+    invalid = batch.run(clargs.paths, compile=clargs.command == 'compile',
+                        directory=getattr(clargs, 'cache_dir', None),
+                        jobs=clargs.jobs, chunksize=clargs.chunksize)
+    return 1 if invalid else 0
+
+
+def _add_server_commands(subparsers):
+    serve = subparsers.add_parser(
+        'serve', help='run a session server',
+        description='Follow many workouts at once from a single process')
+    serve.add_argument('--cache-dir', type=str, default=None,
+                       help='directory to read and write compiled workouts')
+
+    client = subparsers.add_parser(
+        'client', help='send a request to a session server',
+        description='Send a request to a session server')
+    client.add_argument('request', type=str,
+                        choices=('open', 'close', 'start', 'pause', 'stop',
+                                 'progress', 'watch', 'sessions', 'class'),
+                        help='request to send, class opens and follows'
+                        ' several sessions of a workout')
+    client.add_argument('arguments', type=str, nargs='*',
+                        help='workout file for open, workout file and number'
+                        ' of sessions for class, otherwise a session id')
+
+    for subparser in (serve, client):
+        subparser.add_argument('--socket', type=str, default=None,
+                               help='path of the server socket')
+        subparser.add_argument('--port', type=int, default=None,
+                               help='TCP port on the loopback interface to'
+                               ' use instead of a socket')
+        subparser.set_defaults(main=server_main)
+
+
+# Run a session server or send it a request, returns the exit status
+def server_main(clargs):
+    from qintervals import server
+
+    if clargs.command == 'serve':
+        server.serve(clargs.socket, clargs.port, clargs.cache_dir)
+        return 0
+    return server.client(clargs.request, clargs.arguments, clargs.socket,
+                         clargs.port)
+
+
+def _add_sensors_command(subparsers):
+    sensors = subparsers.add_parser(
+        'sensors', help='send synthetic sensor samples',
+        description='Send synthetic heart rate, power and cadence samples')
+    destination = sensors.add_mutually_exclusive_group(required=True)
+    destination.add_argument('--port', type=int, default=None,
+                             help='UDP port on the loopback interface to send'
+                             ' to')
+    destination.add_argument('--socket', type=str, default=None,
+                             help='unix datagram socket to send to')
+    sensors.add_argument('--rate', type=float, default=1000,
+                         help='samples per second of each channel')
+    sensors.add_argument('--duration', type=float, default=None,
+                         help='seconds to send for, until interrupted by'
+                         ' default')
+    sensors.set_defaults(main=sensors_main)
+
+
+# Send synthetic sensor samples in place of real sensors
+def sensors_main(clargs):
+    from qintervals import telemetry
+
+    try:
+        telemetry.generate(clargs.port, clargs.socket, clargs.rate,
+                           clargs.duration)
+    except OSError as error:
+        sys.exit('qintervals: error: {}'.format(error))
+    return 0
+
+
+def _add_timeline_command(subparsers):
+    timeline = subparsers.add_parser(
+        'timeline', help='write the progress of a workout to a file',
+        description='Write the progress of a workout sampled at regular'
+        ' times')
+    timeline.add_argument('workout', type=str,
+                          help='workout file')
+    timeline.add_argument('output', type=str,
+                          help='file to write, the format is given by its'
+                          ' extension: .csv, .npz, .arrow, .feather or'
+                          ' .parquet, or - for CSV on standard output')
+    timeline.add_argument('-r', '--resolution', type=_parse_resolution,
+                          default=1.0, help='seconds between samples')
+    timeline.set_defaults(main=timeline_main)
+
+
+# Write the progress of a workout sampled at regular times to a file
+def timeline_main(clargs):
+    from qintervals import timeline
+
+    try:
+        workout = cache.load(clargs.workout)
+        timeline.export(workout.timeline(clargs.resolution), clargs.output)
+    except BrokenPipeError:
+        raise
+    except WORKOUT_ERRORS + (timeline.ExportError,) as error:
+        sys.exit('qintervals: error: {}'.format(describe_error(error)))
+    return 0
+
+
+def _add_library_command(subparsers, ui):
+    library = subparsers.add_parser(
+        'library', help='catalogue, search and open a library of workout'
+        ' files', description='Catalogue and search a library of workout'
+        ' files')
+    library_commands = library.add_subparsers(dest='library_command',
+                                              metavar='command')
+    library_commands.required = True
+
+    scan = library_commands.add_parser(
+        'scan', help='add workout files to the library, or bring it up to'
+        ' date')
+    scan.add_argument('paths', type=str, nargs='*',
+                      help='workout files or directories to search for'
+                      ' workout files, defaults to those scanned before')
+    scan.add_argument('-j', '--jobs', type=int, default=None,
+                      help='number of worker processes, defaults to the'
+                      ' number of CPUs')
+    scan.add_argument('--chunksize', type=int, default=None,
+                      help='number of files sent to a worker at a time')
+
+    search = library_commands.add_parser(
+        'search', help='list workouts in the library')
+    search.add_argument('text', type=str, nargs='?', default=None,
+                        help='text to find in the title or path')
+    search.add_argument('--min', type=_parse_length, default=None,
+                        help='shortest length, such as 45m, in minutes if no'
+                        ' unit is given')
+    search.add_argument('--max', type=_parse_length, default=None,
+                        help='longest length')
+    search.add_argument('--type', type=str, default=None,
+                        choices=[interval_type.name
+                                 for interval_type in IntervalType],
+                        help='only workouts with intervals of this type')
+    search.add_argument('--limit', type=int, default=None,
+                        help='largest number of workouts to list')
+    search.add_argument('--json', action='store_true',
+                        help='write one JSON object per workout')
+
+    open_ = library_commands.add_parser(
+        'open', parents=[ui], help='show a workout from the library',
+        description='Show a workout from the library, other arguments are'
+        ' passed to Qt')
+    open_.add_argument('id', type=int,
+                       help='id of the workout, as listed by search')
+    open_.set_defaults(main=ui_main)
+
+    for subparser in (scan, search, open_):
+        subparser.add_argument('--library', type=str, default=None,
+                               help='library file to use')
+    for subparser in (scan, search):
+        subparser.set_defaults(main=library_main)
+
+
+# Scan or search the workout library, returns the exit status
+def library_main(clargs):
+    from qintervals.library import Library
+
+    with Library(clargs.library) as library:
+        if clargs.library_command == 'scan':
+            if not clargs.paths and not library.roots():
+                sys.exit('qintervals: error: no directories to scan')
+            result = library.scan(clargs.paths or None, jobs=clargs.jobs,
+                                  chunksize=clargs.chunksize)
+            print('{} parsed, {} unchanged, {} removed, {} invalid'.format(
+                *result))
+            for path, error in library.invalid():
+                print('{}: {}'.format(path, error), file=sys.stderr)
+            return 0
+
+        entries = library.search(clargs.text, clargs.min, clargs.max,
+                                 clargs.type, clargs.limit)
+    for entry in entries:
+        if clargs.json:
+            print(json.dumps(entry._asdict()))
+        else:
+            print('{:>6}  {:>8}  {}  ({})'.format(
+                entry.id, _length_text(entry.total_time), entry.title,
+                entry.path))
+    return 0 if entries else 1
+
+
+# Path of the library entry to open
+def library_path(clargs):
+    from qintervals.library import Library
+
+    with Library(clargs.library) as library:
+        entry = library.get(clargs.id)
+    if entry is None:
+        sys.exit('qintervals: error: no workout {} in the library'.format(
+            clargs.id))
+    return entry.path
+
+
+def _parse_resolution(text):
+    try:
+        resolution = float(text)
+    except ValueError:
+        resolution = 0
+    if not resolution > 0:
+        raise argparse.ArgumentTypeError(
+            'resolution must be positive: {!r}'.format(text))
+    return resolution
+
+
+# Length given as a number of minutes or seconds with an m or s suffix, or
+# minutes without a suffix, in seconds
+def _parse_length(text):
+    try:
+        if text.endswith('s'):
+            return float(text[:-1])
+        return float(text[:-1] if text.endswith('m') else text) * 60
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'invalid length: {!r}'.format(text))
+
 
-    app = QtWidgets.QApplication(sys.argv)
+def _length_text(seconds):
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
 
-    # Get command line arguments
-    clargs = parse_args()
-    # Create workout object
-    workout = Workout(clargs.workout)
 
-    ui = Ui(workout)  # noqa: F841
-    sys.exit(app.exec_())
+# Record the time taken by each stage of start up
+class StartupProfile(object):
+    def __init__(self):
+        self.started = perf_counter()
+        self.marks = []
 
+    # Record the end of a stage
+    def mark(self, stage):
+        self.marks.append((stage, perf_counter()))
 
-def parse_args():
-    parser = argparse.ArgumentParser(prog='qintervals',
-                                     description='Interval training timer')
-    parser.add_argument('workout', type=str, action='store',
-                        help='YAML workout file to read')
+    # Write the duration of each stage and the running total to stderr
+    def report(self, stream=None):
+        if stream is None:
+            stream = sys.stderr
 
-    clargs = parser.parse_args()
-    return clargs
+        previous = self.started
+        for stage, time in self.marks:
+            print('{:<20} {:8.1f} ms {:8.1f} ms'.format(
+                stage, (time-previous)*1e3, (time-self.started)*1e3),
+                file=stream)
+            previous = time
 
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+from .cache import cache_dir, cache_key
+from .interval import IntervalType
+from PyQt5 import QtCore
+from array import array
+from collections import deque
+from math import pi, sin
+from os import path
+from time import perf_counter
+import os
+import sys
+import tempfile
+import wave
+
+_SAMPLE_RATE = 44100
+
+# Tone played at the start of an interval of each type, frequency in Hz and
+# length in seconds. Work intervals use the bundled bell.
+_TONES = {
+    IntervalType.rest: (440, 0.4),
+    IntervalType.warmup: (660, 0.4),
+    IntervalType.warmdown: (550, 0.4)
+}
+_BELL = path.join(path.dirname(__file__), 'tone.wav')
+# Short beeps counting down the last seconds of an interval
+_COUNTDOWN_TONE = (1000, 0.08)
+_COUNTDOWN_SECONDS = 3
+
+# Players for each sound, so that a sound may overlap itself
+_POOL_SIZE = 2
+
+# Number of cue timing errors kept by the latency probe
+_PROBE_SIZE = 1000
+
+# Cues due within this many seconds are not cancelled, the end of an interval
+# may be noticed just before its cue is played
+_IMMINENT = 0.05
+
+
+# Render a sine tone as 16 bit mono PCM wav data
+def render_tone(frequency, length, volume=0.5):
+    n_samples = int(length * _SAMPLE_RATE)
+    # Fade in and out over 5 ms to avoid clicks
+    fade = int(0.005 * _SAMPLE_RATE)
+    amplitude = volume * 32767
+
+    samples = array('h', bytes(2*n_samples))
+    for i in range(n_samples):
+        envelope = min(1, i/fade, (n_samples-i)/fade)
+        samples[i] = int(amplitude * envelope
+                         * sin(2*pi*frequency*i/_SAMPLE_RATE))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
+
+
+# Path of a rendered tone in directory, rendering it unless it is already
+# there. Tones are named by a hash of their parameters and the version of
+# qintervals so that a changed tone is rendered again.
+def tone_file(directory, frequency, length):
+    key = cache_key(repr((frequency, length, _SAMPLE_RATE)).encode())
+    sound_file = path.join(directory, key + '.wav')
+    if path.exists(sound_file):
+        return sound_file
+
+    # Write to a temporary file and rename it so that a partly written file
+    # is never played
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            with wave.open(stream, 'wb') as wave_stream:
+                wave_stream.setnchannels(1)
+                wave_stream.setsampwidth(2)
+                wave_stream.setframerate(_SAMPLE_RATE)
+                wave_stream.writeframes(render_tone(frequency, length))
+        os.replace(temporary, sound_file)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return sound_file
+
+
+# Directory holding rendered tones between runs
+def tone_dir():
+    return path.join(cache_dir(), 'tones')
+
+
+# Sound files for each cue, the interval types, 'countdown' and None for the
+# end of the workout. Tones are rendered once into the cache, or into a
+# temporary directory kept alive by the returned object if the cache cannot
+# be written.
+def sound_files():
+    sounds = {IntervalType.work: _BELL, None: _BELL}
+    tones = dict(_TONES, countdown=_COUNTDOWN_TONE)
+    directory = None
+    try:
+        for name, (frequency, length) in tones.items():
+            sounds[name] = tone_file(tone_dir(), frequency, length)
+    except OSError:
+        # The cache is an optimisation, carry on without it
+        directory = tempfile.TemporaryDirectory(prefix='qintervals')
+        for name, (frequency, length) in tones.items():
+            sounds[name] = tone_file(directory.name, frequency, length)
+    return sounds, directory
+
+
+# Sound cues for interval transitions
+#
+# All sounds are rendered and decoded by load, before the workout starts, into
+# a pool of QSoundEffect players so that no file is read while the workout is
+# running. Rendered tones are kept in the cache so they are only rendered
+# once. Cues are scheduled ahead of time against the end of the current
+# interval with precise timers rather than played when a change is noticed.
+class Audio(QtCore.QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._players = None
+        self._next_player = {}
+        self._timers = []
+
+        # Latency probe, the difference between when each cue was due and
+        # when it was played, in seconds
+        self.cue_errors = deque(maxlen=_PROBE_SIZE)
+
+    # Render the tones and create the players
+    # QtMultimedia is slow to import so is only loaded here
+    def load(self):
+        try:
+            from PyQt5 import QtMultimedia
+        except ImportError as error:
+            print('qintervals: sound disabled: {}'.format(error),
+                  file=sys.stderr)
+            self._players = {}
+            return
+
+        sounds, self._directory = sound_files()
+        self._players = {}
+        for name, sound_file in sounds.items():
+            players = []
+            for _ in range(_POOL_SIZE):
+                player = QtMultimedia.QSoundEffect(self)
+                player.setSource(QtCore.QUrl.fromLocalFile(sound_file))
+                players.append(player)
+            self._players[name] = players
+            self._next_player[name] = 0
+
+    # Play a sound now, the sound for the start of an interval type,
+    # 'countdown' or None for the end of the workout
+    def play(self, name):
+        if self._players is None:
+            self.load()
+        players = self._players.get(name)
+        if players:
+            index = self._next_player[name]
+            self._next_player[name] = (index+1) % len(players)
+            players[index].play()
+
+    # Schedule the cues for the end of the current interval, delay seconds
+    # from now, followed by an interval of the given type or the end of the
+    # workout if next_type is None
+    def schedule(self, delay, next_type):
+        self.cancel()
+        now = perf_counter()
+
+        self._schedule_cue(now, delay, next_type)
+        for second in range(1, _COUNTDOWN_SECONDS+1):
+            if delay - second > 0:
+                self._schedule_cue(now, delay-second, 'countdown')
+
+    def _schedule_cue(self, now, delay, name):
+        due = now + delay
+
+        def play():
+            self.cue_errors.append(perf_counter() - due)
+            self.play(name)
+
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.setTimerType(QtCore.Qt.PreciseTimer)
+        timer.timeout.connect(play)
+        timer.start(max(round(delay*1000), 0))
+        self._timers.append((due, timer))
+
+    # Cancel the scheduled cues, except those which are imminent
+    def cancel(self):
+        now = perf_counter()
+        pending = []
+        for due, timer in self._timers:
+            if timer.isActive() and due - now <= _IMMINENT:
+                pending.append((due, timer))
+            else:
+                timer.stop()
+                timer.deleteLater()
+        self._timers = pending
+
+    # Summarise the latency probe, returns the number of cues played and the
+    # mean and largest absolute timing errors in milliseconds
+    def latency(self):
+        errors = [abs(error) for error in self.cue_errors]
+        if not errors:
+            return 0, 0.0, 0.0
+        return (len(errors), sum(errors)/len(errors)*1e3,
+                max(errors)*1e3)
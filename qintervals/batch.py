@@ -0,0 +1,82 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from . import cache
+from .interval import IntervalType
+from .workout import Workout, WORKOUT_ERRORS, describe_error
+import json
+import os
+import sys
+
+# Extensions of workout files found when searching directories
+_EXTENSIONS = ('.yml', '.yaml')
+
+
+# Summarise a single workout file as a dictionary which may be written as JSON
+# If compile is true the compiled workout is also written to the cache.
+def summarise(yaml_file, compile=False, directory=None):
+    try:
+        if compile:
+            workout = cache.load(yaml_file, directory=directory)
+        else:
+            workout = Workout(yaml_file)
+    except WORKOUT_ERRORS as error:
+        return {
+            'file': yaml_file,
+            'valid': False,
+            'error': type(error).__name__,
+            'message': describe_error(error)
+        }
+
+    counts = workout.schedule.type_counts()
+    return {
+        'file': yaml_file,
+        'valid': True,
+        'title': str(workout.name),
+        'total_time': workout.total_time,
+        'intervals': len(workout.intervals),
+        'types': {interval_type.name: counts[interval_type]
+                  for interval_type in IntervalType}
+    }
+
+
+# Expand directories into the workout files they contain
+def find_workouts(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# Summarise many workout files in parallel, writing one JSON object per line
+# to stream as each result becomes available, in the order the files were
+# given. Returns the number of invalid workout files.
+def run(paths, compile=False, directory=None, jobs=None, chunksize=None,
+        stream=None):
+    if stream is None:
+        stream = sys.stdout
+    files = list(find_workouts(paths))
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    # Send files to the workers in chunks to reduce the cost of communication
+    # while leaving enough chunks to balance the load
+    if chunksize is None:
+        chunksize = max(1, len(files) // (jobs*4))
+
+    invalid = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(
+            partial(summarise, compile=compile, directory=directory),
+            files, chunksize=chunksize)
+        for result in results:
+            if not result['valid']:
+                invalid += 1
+            stream.write(json.dumps(result) + '\n')
+            stream.flush()
+
+    return invalid
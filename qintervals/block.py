@@ -0,0 +1,205 @@
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import islice
+from .interval import IntervalType
+
+
+# A repeated sequence of intervals and blocks
+#
+# Blocks are never expanded. Queries for the interval at a given time or
+# position descend the tree of blocks arithmetically so that the memory used
+# is proportional to the size of the workout file rather than the number of
+# intervals in the schedule.
+class Block(object):
+    __slots__ = ('entries', 'repeats', 'skip_last_rest', '_ends_at',
+                 '_counts', '_blocks', 'period', 'period_count', 'length',
+                 'count')
+
+    def __init__(self, entries=(), repeats=1, skip_last_rest=False):
+        self.entries = []
+        self.repeats = repeats
+        self.skip_last_rest = False
+
+        # Running totals over a single repetition, the time at which each
+        # entry ends and the number of intervals up to and including each
+        # entry, stored as contiguous columns
+        self._ends_at = array('d')
+        self._counts = array('q')
+        # Positions in entries of the entries which are blocks
+        self._blocks = array('q')
+
+        # Length and number of intervals of a single repetition
+        self.period = 0.0
+        self.period_count = 0
+
+        # Length and number of intervals of the whole block
+        self.length = 0.0
+        self.count = 0
+
+        for entry in entries:
+            self.append(entry)
+
+        # Drop the final interval if it is a rest
+        if skip_last_rest and self.count > 0:
+            last, _ = self.interval_at(self.count-1)
+            if last.interval_type is IntervalType.rest:
+                self.skip_last_rest = True
+                self._update_totals()
+
+    # Add an interval or block to the end of a single repetition
+    def append(self, entry):
+        if isinstance(entry, Block):
+            count = entry.count
+            self._blocks.append(len(self.entries))
+        else:
+            count = 1
+
+        self.entries.append(entry)
+        self.period += entry.length
+        self.period_count += count
+        self._ends_at.append(self.period)
+        self._counts.append(self.period_count)
+        self._update_totals()
+
+    def _update_totals(self):
+        self.length = self.period * self.repeats
+        self.count = self.period_count * self.repeats
+        if self.skip_last_rest:
+            last, _ = self.interval_at(self.period_count-1)
+            self.length -= last.length
+            self.count -= 1
+
+    # Return the interval at a position in the block and its starting time
+    def interval_at(self, index):
+        repeat, offset = divmod(index, self.period_count)
+        i = bisect_right(self._counts, offset)
+        starts_at = repeat*self.period
+        if i > 0:
+            starts_at += self._ends_at[i-1]
+            offset -= self._counts[i-1]
+
+        entry = self.entries[i]
+        if isinstance(entry, Block):
+            interval, sub_starts_at = entry.interval_at(offset)
+            return interval, starts_at+sub_starts_at
+        else:
+            return entry, starts_at
+
+    # Number of blocks directly inside this block
+    @property
+    def block_count(self):
+        return len(self._blocks)
+
+    # Find where the i-th block directly inside this block first starts,
+    # returns the position of its first interval and its starting time
+    def block_start(self, i):
+        entry = self._blocks[i]
+        if entry == 0:
+            return 0, 0.0
+        return self._counts[entry-1], self._ends_at[entry-1]
+
+    # Find the interval containing a time, returns the interval, its position
+    # in the block and its starting time
+    def locate(self, time):
+        # Clamp the repetition to guard against rounding at the final boundary
+        repeat = min(int(time // self.period), self.repeats-1)
+        offset = time - repeat*self.period
+
+        i = min(bisect_right(self._ends_at, offset), len(self.entries)-1)
+        starts_at = repeat*self.period
+        index = repeat*self.period_count
+        if i > 0:
+            starts_at += self._ends_at[i-1]
+            index += self._counts[i-1]
+
+        entry = self.entries[i]
+        if isinstance(entry, Block):
+            interval, sub_index, sub_starts_at = entry.locate(
+                time-starts_at)
+            return interval, index+sub_index, starts_at+sub_starts_at
+        else:
+            return entry, index, starts_at
+
+    # Count the intervals of each type in the block
+    def type_counts(self):
+        counts = Counter()
+        for entry in self.entries:
+            if isinstance(entry, Block):
+                counts.update(entry.type_counts())
+            else:
+                counts[entry.interval_type] += 1
+
+        for interval_type in counts:
+            counts[interval_type] *= self.repeats
+        if self.skip_last_rest:
+            counts[IntervalType.rest] -= 1
+        return counts
+
+    # Iterate over the intervals in the block starting from a position
+    def iter_intervals(self, index=0):
+        if index >= self.count:
+            return iter(())
+        return islice(self._iter_from(index), self.count-index)
+
+    def _iter_from(self, index):
+        repeat, offset = divmod(index, self.period_count)
+        first = bisect_right(self._counts, offset)
+        if first > 0:
+            offset -= self._counts[first-1]
+
+        for _ in range(repeat, self.repeats):
+            for entry in islice(self.entries, first, None):
+                if isinstance(entry, Block):
+                    yield from entry.iter_intervals(offset)
+                else:
+                    yield entry
+                offset = 0
+            first = 0
+
+    # Iterate over the intervals from a position as runs of repeated entries
+    #
+    # Each run is a tuple of an interval or block, the number of times it is
+    # repeated and the number of intervals it covers. Whole repetitions of a
+    # block are a single run, the remainder of a partly finished repetition is
+    # broken into the entries it contains and a block repeated once is
+    # expanded.
+    def iter_runs(self, index=0):
+        remaining = self.count - index
+        # Blocks without any intervals have no runs
+        if remaining <= 0:
+            return
+        for entry, repeats, count in self._iter_runs(index):
+            if remaining <= 0:
+                return
+            # Only the last run may be cut short by a skipped final rest
+            count = min(count, remaining)
+            remaining -= count
+            yield entry, repeats, count
+
+    def _iter_runs(self, index):
+        repeat, offset = divmod(index, self.period_count)
+        if offset:
+            first = bisect_right(self._counts, offset)
+            if first > 0:
+                offset -= self._counts[first-1]
+            for entry in islice(self.entries, first, None):
+                yield from _entry_runs(entry, offset)
+                offset = 0
+            repeat += 1
+
+        repeats = self.repeats - repeat
+        if repeats > 1:
+            yield self, repeats, repeats*self.period_count
+        elif repeats == 1:
+            for entry in self.entries:
+                yield from _entry_runs(entry, 0)
+
+    def __iter__(self):
+        return self.iter_intervals()
+
+
+def _entry_runs(entry, index):
+    if isinstance(entry, Block):
+        return entry.iter_runs(index)
+    return iter(((entry, 1, 1),))
@@ -0,0 +1,223 @@
+from . import __version__
+from .block import Block
+from .interval import Interval, IntervalType
+from .plan import Plan, intern_plan
+from .workout import Workout
+from hashlib import sha256
+from io import BytesIO
+from weakref import WeakValueDictionary
+import mmap
+import os
+import struct
+import tempfile
+
+# Largest total size of the compiled workout cache before the least recently
+# used workouts are removed, in bytes
+MAX_SIZE = 64 * 1024**2
+
+# Compiled workout format
+#
+# A header is followed by a string table and then the schedule as a tree of
+# fixed size nodes in depth first order. An interval node holds its type,
+# the index of its name in the string table and its length in seconds. A
+# block node holds whether its last rest is skipped, its number of repeats
+# and its number of child nodes. The root node is the top level of the
+# workout and the first string is the workout title.
+_MAGIC = b'QINT'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHII')
+_STRING_LENGTH = struct.Struct('<I')
+_NODE = struct.Struct('<BBIId')
+_INTERVAL_NODE = 0
+_BLOCK_NODE = 1
+
+_SUFFIX = '.qint'
+
+# Plans already loaded by this process, by cache key
+_loaded = WeakValueDictionary()
+
+
+# Compiled workout file format error
+class CompiledWorkoutError(Exception):
+    pass
+
+
+# Directory used to store compiled workouts
+def cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'qintervals')
+
+
+# Cache key for a workout file, changes with the file contents and the version
+# of qintervals
+def cache_key(yaml_bytes):
+    digest = sha256(__version__.encode())
+    digest.update(yaml_bytes)
+    return digest.hexdigest()
+
+
+# Load a workout file, using the compiled copy from the cache if the file has
+# not changed since it was compiled
+def load(yaml_file, directory=None, max_size=MAX_SIZE, clock=None):
+    return Workout(plan=load_plan(yaml_file, directory, max_size),
+                   clock=clock)
+
+
+# Load the plan of a workout file, plans already loaded by this process are
+# shared and plans read from the cache or parsed are interned
+def load_plan(yaml_file, directory=None, max_size=MAX_SIZE):
+    if directory is None:
+        directory = cache_dir()
+
+    with open(yaml_file, 'rb') as stream:
+        yaml_bytes = stream.read()
+    key = cache_key(yaml_bytes)
+    plan = _loaded.get(key)
+    if plan is not None:
+        return plan
+
+    compiled_file = os.path.join(directory, key+_SUFFIX)
+    try:
+        plan = read_compiled(compiled_file)
+    except (OSError, CompiledWorkoutError):
+        # Parse the bytes already read, keeping the file name for error
+        # messages
+        stream = BytesIO(yaml_bytes)
+        stream.name = yaml_file
+        workout = Workout()
+        workout.from_yaml(stream)
+        plan = workout.plan
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            write_compiled(plan, compiled_file)
+            evict(directory, max_size)
+        except OSError:
+            # The cache is an optimisation, carry on without it
+            pass
+    else:
+        # Mark the compiled workout as recently used
+        try:
+            os.utime(compiled_file)
+        except OSError:
+            # The cache is an optimisation, carry on without it
+            pass
+
+    plan = intern_plan(plan)
+    _loaded[key] = plan
+    return plan
+
+
+# Write a workout plan in the compiled format
+def write_compiled(plan, compiled_file):
+    strings = {plan.name: 0}
+    nodes = []
+    _encode(plan.schedule, strings, nodes)
+
+    chunks = [_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(strings), len(nodes))]
+    for string in strings:
+        encoded = string.encode()
+        chunks.append(_STRING_LENGTH.pack(len(encoded)))
+        chunks.append(encoded)
+    chunks.extend(nodes)
+
+    # Write to a temporary file and rename it so that a partly written file
+    # is never read
+    directory = os.path.dirname(os.path.abspath(compiled_file))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(b''.join(chunks))
+        os.replace(temporary, compiled_file)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _encode(entry, strings, nodes):
+    if isinstance(entry, Block):
+        nodes.append(_NODE.pack(_BLOCK_NODE, entry.skip_last_rest,
+                                entry.repeats, len(entry.entries), 0.0))
+        for child in entry.entries:
+            _encode(child, strings, nodes)
+    else:
+        text_index = strings.setdefault(entry.text, len(strings))
+        nodes.append(_NODE.pack(_INTERVAL_NODE, entry.interval_type.value,
+                                text_index, 0, entry.length))
+
+
+# Read a workout plan in the compiled format
+def read_compiled(compiled_file):
+    with open(compiled_file, 'rb') as stream:
+        try:
+            data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise CompiledWorkoutError(
+                'Empty compiled workout: {}'.format(compiled_file))
+
+    with data:
+        try:
+            return _decode_plan(data)
+        except (struct.error, UnicodeDecodeError, ValueError, IndexError):
+            raise CompiledWorkoutError(
+                'Invalid compiled workout: {}'.format(compiled_file))
+
+
+def _decode_plan(data):
+    magic, version, n_strings, n_nodes = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ValueError('Unrecognised format')
+    offset = _HEADER.size
+
+    strings = []
+    for _ in range(n_strings):
+        (length,) = _STRING_LENGTH.unpack_from(data, offset)
+        offset += _STRING_LENGTH.size
+        strings.append(data[offset:offset+length].decode())
+        offset += length
+
+    schedule, offset = _decode(data, offset, strings)
+    if offset != len(data):
+        raise ValueError('Trailing data')
+
+    return Plan(strings[0], schedule.entries).freeze()
+
+
+def _decode(data, offset, strings):
+    kind, flag, a, b, length = _NODE.unpack_from(data, offset)
+    offset += _NODE.size
+
+    if kind == _BLOCK_NODE:
+        children = []
+        for _ in range(b):
+            child, offset = _decode(data, offset, strings)
+            children.append(child)
+        return Block(children, a, bool(flag)), offset
+    elif kind == _INTERVAL_NODE:
+        # repr gives the shortest string which converts back to the same
+        # length exactly
+        return Interval(IntervalType(flag), strings[a],
+                        '{!r}s'.format(length)), offset
+    else:
+        raise ValueError('Unknown node type {}'.format(kind))
+
+
+# Remove the least recently used compiled workouts until the cache is no
+# larger than max_size
+def evict(directory, max_size=MAX_SIZE):
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(_SUFFIX):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,38 @@
+from time import perf_counter_ns
+
+# Nanoseconds in a second
+NS_PER_SECOND = 10**9
+
+
+# Convert a time in seconds to whole nanoseconds
+def to_ns(seconds):
+    return round(seconds * NS_PER_SECOND)
+
+
+# Convert a time in nanoseconds to seconds
+def to_seconds(ns):
+    return ns / NS_PER_SECOND
+
+
+# Monotonic, high resolution clock. Times are integer nanoseconds from an
+# arbitrary reference point so are unaffected by changes to the system clock.
+class MonotonicClock(object):
+    def now(self):
+        return perf_counter_ns()
+
+
+# Clock which only moves when it is advanced, for tests and simulations
+class VirtualClock(object):
+    def __init__(self, start=0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    # Move the clock forward by a number of seconds
+    def advance(self, seconds):
+        self.time += to_ns(seconds)
+
+    # Move the clock to a number of seconds after its reference point
+    def set(self, seconds):
+        self.time = to_ns(seconds)
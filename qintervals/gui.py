@@ -1,7 +1,12 @@
-from .workout import WorkoutState
-from PyQt5 import QtCore, QtGui, QtWidgets, QtMultimedia
-from os import path
-from math import sin, pi
+from .audio import Audio
+from .block import Block
+from .workout import WorkoutState, WORKOUT_ERRORS, describe_error
+from PyQt5 import QtCore, QtGui, QtWidgets
+from functools import partial
+from itertools import islice
+from math import ceil, cos, sin, pi
+import sys
+from time import perf_counter
 
 _WIDTH = 700
 _HEIGHT = 500
@@ -12,10 +17,49 @@ _COLOUR_RED = QtGui.QColor(228, 26, 28)
 _COLOUR_BLUE = QtGui.QColor(55, 126, 184)
 _COLOUR_GREEN = QtGui.QColor(77, 175, 74)
 
+# Shortest time between redraws, in seconds
+_MIN_FRAME_PERIOD = 0.05
+
+# Number of intervals or blocks read at a time when loading incrementally
+_LOAD_BATCH = 100
+
+# Time moved by the seek shortcuts, in seconds
+_SEEK_STEP = 10
+
+# Number of upcoming runs read at a time by the upcoming list
+_FETCH_BATCH = 20
+# Number of entries of a block described before the rest are elided
+_GROUP_ENTRIES = 4
+
+# Text of the whole minutes and of the seconds, to a tenth, within a minute of
+# the times shown by the timers
+_MINUTES_TEXT = ['{:2d}'.format(minutes) for minutes in range(100)]
+_SECONDS_TEXT = ['{:04.1f}'.format(tenths/10) for tenths in range(600)]
+
+# Phases of a frame timed when collecting frame statistics
+FRAME_PHASES = ('progress', 'timers', 'count down', 'interval change',
+                'schedule', 'paint', 'telemetry')
+(_PHASE_PROGRESS, _PHASE_TIMERS, _PHASE_COUNT_DOWN, _PHASE_INTERVAL_CHANGE,
+ _PHASE_SCHEDULE, _PHASE_PAINT, _PHASE_TELEMETRY) = range(len(FRAME_PHASES))
+
+# Names and units of the telemetry channels shown
+_TELEMETRY_LABELS = (('Heart rate', 'bpm'), ('Power', 'W'),
+                     ('Cadence', 'rpm'))
+# Period of sensor reading updates while the redraw timers are not running,
+# in milliseconds
+_TELEMETRY_PERIOD = 250
+
 
 class Ui(QtWidgets.QMainWindow):
-    def __init__(self, workout):
+    # Emitted once the window has first been drawn
+    first_frame = QtCore.pyqtSignal()
+
+    # stats is an optional stats.FrameStats recorder for the phases in
+    # FRAME_PHASES and telemetry optional telemetry.Telemetry samples to show
+    def __init__(self, workout, stats=None, telemetry=None):
         super().__init__()
+        self.stats = stats
+        self.telemetry = telemetry
         self.init_fonts()
         self.init_ui(workout)
 
@@ -81,6 +125,7 @@ class Ui(QtWidgets.QMainWindow):
 
         # Count down
         self.count_down = CountDown(self)
+        self.count_down.stats = self.stats
         self.count_down.addWidget(self.label_interval_name,
                                   QtCore.Qt.AlignCenter)
         self.count_down.addWidget(self.timers, QtCore.Qt.AlignCenter)
@@ -92,54 +137,187 @@ class Ui(QtWidgets.QMainWindow):
         self.grid_layout.addWidget(self.upcoming_intervals, 1, 1, 2, 1,
                                    QtCore.Qt.AlignCenter)
 
-        # Sound for changing interval
-        self.bell = QtMultimedia.QSound(path.dirname(__file__)+'/tone.wav')
+        # Sounds for changing interval, loaded after the window has been drawn
+        self.audio = Audio(self)
+        self._painted = False
+        self.first_frame.connect(self.audio.load, QtCore.Qt.QueuedConnection)
 
         # Create buttons
         self.buttons = Buttons(self)
         self.grid_layout.addWidget(self.buttons, 2, 0, 1, 1,
                                    QtCore.Qt.AlignCenter)
+
+        # Sensor readings
+        if self.telemetry is not None:
+            self.telemetry_panel = TelemetryPanel(self)
+            self.grid_layout.addWidget(self.telemetry_panel, 3, 0, 1, -1,
+                                       QtCore.Qt.AlignCenter)
         # Create start/pause shortcut
         self.shortcut_start_pause = QtWidgets.QShortcut(
             QtCore.Qt.Key_Space, self, self.start_pause)
         # Create stop shortcut
         self.shortcut_stop = QtWidgets.QShortcut(QtCore.Qt.Key_S, self,
                                                  self.stop)
-
-        # Initialise timer
-        self.timer = QtCore.QTimer()
-        self.timer.setInterval(50)
-        self.timer.timeout.connect(self.redraw)
-        self.timer.start()
-
+        # Create seek shortcuts, the arrow keys skip intervals or with shift
+        # seek by a few seconds, home restarts the current interval and the
+        # number keys jump to the first nine blocks
+        seek_keys = [
+            (QtCore.Qt.Key_Right, partial(self.skip_interval, 1)),
+            (QtCore.Qt.Key_Left, partial(self.skip_interval, -1)),
+            (QtCore.Qt.Key_Home, partial(self.skip_interval, 0)),
+            (QtCore.Qt.SHIFT + QtCore.Qt.Key_Right,
+             partial(self.seek_by, _SEEK_STEP)),
+            (QtCore.Qt.SHIFT + QtCore.Qt.Key_Left,
+             partial(self.seek_by, -_SEEK_STEP))
+        ] + [(QtCore.Qt.Key_1 + i, partial(self.jump_to_block, i))
+             for i in range(9)]
+        self.shortcuts_seek = [QtWidgets.QShortcut(key, self, action)
+                               for key, action in seek_keys]
+
+        # Redraw timers, the frame timer fires when the times displayed or the
+        # count down arcs next change and the interval timer fires at the end
+        # of the current interval. Neither runs unless the workout is running.
+        self.frame_timer = QtCore.QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.frame_timer.timeout.connect(self.timed_redraw)
+
+        self.interval_timer = QtCore.QTimer(self)
+        self.interval_timer.setSingleShot(True)
+        self.interval_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.interval_timer.timeout.connect(self.timed_redraw)
+
+        self.redraw()
         self.show()
 
-    # Redraw dynamic elements of the ui
-    def redraw(self):
-        # Obtain current time elapsed and remaining, and current interval
-        (elapsed, remaining, interval_elapsed, interval_remaining, interval,
-         changed_interval) = self.workout.progress()
-
-        self.timers.update_times(remaining, interval_remaining)
-
-        self.count_down.update_times(elapsed, remaining, interval_elapsed,
-                                     interval_remaining)
-        self.count_down.repaint()
-
-        self.buttons.update_buttons()
+    # Signal first_frame once the first paint of the window and its children
+    # has finished, work which can wait is left until then
+    def paintEvent(self, e):
+        super().paintEvent(e)
+        if not self._painted:
+            self._painted = True
+            QtCore.QTimer.singleShot(0, self.first_frame.emit)
+
+    # Redraw dynamic elements of the ui, timed is true when the redraw was
+    # started by one of the redraw timers
+    def redraw(self, timed=False):
+        stats = self.stats
+        if stats is not None:
+            stats.begin_frame(timed)
 
-        if changed_interval:
-            # Play sound if interval has changed
-            self.bell.play()
+        # Obtain current time elapsed and remaining, and current interval
+        progress = self.workout.progress()
+        if stats is not None:
+            stats.mark(_PHASE_PROGRESS)
+
+        self.timers.update_times(progress.remaining,
+                                 progress.interval_remaining)
+        if stats is not None:
+            stats.mark(_PHASE_TIMERS)
+
+        if self.telemetry is not None:
+            self.telemetry_panel.update_readings()
+            if stats is not None:
+                stats.mark(_PHASE_TELEMETRY)
+
+        self.count_down.update_times(progress.elapsed, progress.remaining,
+                                     progress.interval_elapsed,
+                                     progress.interval_remaining)
+        if stats is not None:
+            stats.mark(_PHASE_COUNT_DOWN)
+
+        if progress.changed_interval:
+            # Schedule sounds for the end of the new interval
+            self.schedule_cues()
             # Write current interval name
-            self.label_interval_name.setText(interval.text)
+            self.label_interval_name.setText(progress.interval.text)
             # Write upcoming interval names
             self.upcoming_intervals.write_upcoming_intervals()
+            # The workout stops itself after the final interval
+            self.buttons.update_buttons()
+            if stats is not None:
+                stats.mark(_PHASE_INTERVAL_CHANGE)
+
+        self.schedule_redraw(progress)
+        if stats is not None:
+            stats.mark(_PHASE_SCHEDULE)
+
+    def timed_redraw(self):
+        self.redraw(timed=True)
+
+    # Set the redraw timers for the next change to the display
+    def schedule_redraw(self, progress):
+        if self.workout.state != WorkoutState.running:
+            self.frame_timer.stop()
+            self.interval_timer.stop()
+            return
+
+        # Time until the tenths of a second displayed change, the displayed
+        # values are rounded so change half way between tenths
+        label_delay = min(_time_to_step(progress.remaining - 0.05, 0.1),
+                          _time_to_step(progress.interval_remaining - 0.05,
+                                        0.1))
+
+        # Time until the interval arc, the fastest moving, advances a pixel
+        arc_delay = _time_to_step(
+            progress.interval_remaining,
+            self.count_down.pixel_time(progress.interval.length))
+
+        frame_msec = _msec(max(min(label_delay, arc_delay),
+                               _MIN_FRAME_PERIOD))
+        interval_msec = _msec(progress.interval_remaining)
+        self.frame_timer.start(frame_msec)
+        self.interval_timer.start(interval_msec)
+
+        if self.stats is not None:
+            self.stats.expect(min(frame_msec, interval_msec) * 10**6)
+
+    # Continue reading the workout while the ui is shown, a batch of entries is
+    # read whenever the event loop is idle
+    def load_remaining(self, loading):
+        self._loading = loading
+        self.load_timer = QtCore.QTimer(self)
+        self.load_timer.timeout.connect(self._load_batch)
+        self.load_timer.start(0)
+
+    def _load_batch(self):
+        try:
+            loaded = sum(1 for _ in islice(self._loading, _LOAD_BATCH))
+        except WORKOUT_ERRORS as error:
+            self.load_timer.stop()
+            print('qintervals: error: {}'.format(describe_error(error)),
+                  file=sys.stderr)
+            QtWidgets.QApplication.exit(1)
+            return
+
+        if loaded < _LOAD_BATCH:
+            self.load_timer.stop()
+
+        self.label_workout_name.setText(self.workout.name)
+        self.upcoming_intervals.write_upcoming_intervals()
+        self.redraw()
+
+    # Schedule the sounds played at the end of the current interval
+    def schedule_cues(self):
+        position = self.workout.current_position()
+        if self.workout.state != WorkoutState.running or position is None:
+            self.audio.cancel()
+            return
+
+        upcoming = self.workout.upcoming(limit=1)
+        if upcoming:
+            next_type = upcoming[0].interval_type
+        else:
+            next_type = None
+        self.audio.schedule(position.ends_at - self.workout.elapsed(),
+                            next_type)
 
     # Start or pause the workout
     def start_pause(self):
         self.workout.start_pause()
         self.buttons.update_buttons()
+        self.redraw()
+        self.schedule_cues()
 
     # Stop the workout
     def stop(self):
@@ -147,6 +325,52 @@ class Ui(QtWidgets.QMainWindow):
         self.label_interval_name.setText(self.workout.intervals[0].text)
         self.upcoming_intervals.write_upcoming_intervals()
         self.buttons.update_buttons()
+        self.redraw()
+        self.schedule_cues()
+
+    # Seek forward, or backward if seconds is negative
+    def seek_by(self, seconds):
+        self._move(self.workout.seek, self.workout.elapsed() + seconds)
+
+    # Skip forward n intervals, or backward if n is negative
+    def skip_interval(self, n):
+        self._move(self.workout.skip_interval, n)
+
+    # Jump to the start of a top level block, if it exists
+    def jump_to_block(self, i):
+        if i < self.workout.schedule.block_count:
+            self._move(self.workout.jump_to_block, i)
+
+    # Move the workout with one of its seek methods and update the display
+    # for the new position
+    def _move(self, method, *args):
+        method(*args)
+        position = self.workout.current_position()
+        if position is not None:
+            self.label_interval_name.setText(position.interval.text)
+            self.upcoming_intervals.write_upcoming_intervals()
+        self.buttons.update_buttons()
+        self.redraw()
+        self.schedule_cues()
+
+
+# Time until a decreasing value next crosses a multiple of step
+def _time_to_step(value, step):
+    return value % step or step
+
+
+# Format a time in tenths of a second as minutes and seconds
+def _time_text(tenths):
+    minutes, tenths = divmod(max(tenths, 0), 600)
+    if minutes < len(_MINUTES_TEXT):
+        return _MINUTES_TEXT[minutes] + ':' + _SECONDS_TEXT[tenths]
+    return str(minutes) + ':' + _SECONDS_TEXT[tenths]
+
+
+# Convert a delay in seconds to whole milliseconds, rounding up so that timers
+# fire after the change they are waiting for
+def _msec(seconds):
+    return max(ceil(seconds*1000), 1)
 
 
 class Timers(QtWidgets.QWidget):
@@ -182,18 +406,73 @@ class Timers(QtWidgets.QWidget):
         self.grid_layout.addWidget(self.label_total_remaining_time, 3, 1,
                                    QtCore.Qt.AlignRight)
 
-    # Update times
+        # Fix the size of the times, wide enough for any time below 1000
+        # minutes, so that changing their text does not relayout the window
+        for label in (self.label_interval_remaining_time,
+                      self.label_total_remaining_time):
+            label.setFixedSize(label.fontMetrics().size(0, '000:00.0'))
+
+        # Times displayed, in tenths of a second
+        self._interval_tenths = 0
+        self._total_tenths = 0
+
+    # Update times, labels are only rewritten when the tenths of a second
+    # displayed change as setting the text of a label may relayout the window
     def update_times(self, remaining, interval_remaining):
-        # Write current times
-        self.label_interval_remaining_time.setText(
-            self.time_str(interval_remaining))
-        self.label_total_remaining_time.setText(self.time_str(remaining))
+        tenths = round(interval_remaining*10)
+        if tenths != self._interval_tenths:
+            self._interval_tenths = tenths
+            self.label_interval_remaining_time.setText(_time_text(tenths))
+
+        tenths = round(remaining*10)
+        if tenths != self._total_tenths:
+            self._total_tenths = tenths
+            self.label_total_remaining_time.setText(_time_text(tenths))
 
     # Format a time in seconds for output
     def time_str(self, time):
-        minutes, seconds = divmod(time, 60)
-        string = "{:2d}:{:04.1f}".format(int(minutes), seconds)
-        return string
+        return _time_text(round(time*10))
+
+
+# Latest sensor readings and their means over the current interval
+class TelemetryPanel(QtWidgets.QLabel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.workout = self.parentWidget().workout
+        self.telemetry = self.parentWidget().telemetry
+        self._text = None
+        self.update_readings()
+
+        # Samples arrive whether or not the workout is running, and the
+        # redraw timers only run while it is
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.update_readings)
+        self.timer.start(_TELEMETRY_PERIOD)
+
+    # Only the latest sample of each channel and the aggregates of the
+    # current interval are read, however many samples have arrived
+    def update_readings(self):
+        position = self.workout.current_position()
+        aggregates = None
+        if (position is not None
+                and self.workout.state != WorkoutState.stopped):
+            aggregates = self.telemetry.aggregates(position.index)
+
+        parts = []
+        for channel, (name, unit) in enumerate(_TELEMETRY_LABELS):
+            latest = self.telemetry.latest(channel)
+            if latest is None:
+                parts.append('{} \u2013'.format(name))
+                continue
+            part = '{} {:.0f} {}'.format(name, latest, unit)
+            if aggregates is not None and aggregates[channel].count:
+                part += ' (mean {:.0f})'.format(aggregates[channel].mean)
+            parts.append(part)
+
+        text = '    '.join(parts)
+        if text != self._text:
+            self._text = text
+            self.setText(text)
 
 
 class Buttons(QtWidgets.QWidget):
@@ -223,10 +502,16 @@ class Buttons(QtWidgets.QWidget):
         self.button_stop.clicked.connect(self.parentWidget().stop)
         self.hbox.addWidget(self.button_stop, QtCore.Qt.AlignCenter)
 
+        # Workout state the buttons were last updated for
+        self._state = None
         self.update_buttons()
 
     # Write the appropriate button labels and activate/deactivate as necessary
     def update_buttons(self):
+        if self.workout.state == self._state:
+            return
+        self._state = self.workout.state
+
         if self.workout.state == WorkoutState.running:
             self.button_start_pause.setText('Pause')
             self.button_stop.setEnabled(True)
@@ -260,7 +545,7 @@ class CountDown(QtWidgets.QWidget):
         # V box in the centre of the arcs
         self._CENTRE = self._DIMENSION/2
         self._INNER_RADIUS = self._CENTRE - 2*self._PEN_WIDTH
-        self._INSET = self._CENTRE - self._INNER_RADIUS * sin(pi/4)
+        self._INSET = int(self._CENTRE - self._INNER_RADIUS * sin(pi/4))
         self.contents = QtWidgets.QWidget(self)
         self.contents.setGeometry(QtCore.QRect(
             QtCore.QPoint(self._INSET, self._INSET),
@@ -269,8 +554,20 @@ class CountDown(QtWidgets.QWidget):
         self.vbox = QtWidgets.QVBoxLayout(self.contents)
         self.vbox.setContentsMargins(0, 0, 0, 0)
 
+        # Full rings for each arc, rendered when the widget is resized, and
+        # the arc angles they were last drawn at
+        self._rings = None
+        self._drawn_angles = (self._TOTAL_ANGLE, self._TOTAL_ANGLE)
+
+        # Time taken by the last paint event, in seconds, and an optional
+        # frame statistics recorder
+        self.paint_time = 0.0
+        self.stats = None
+
         self.update_times(0, 1, 0, 1)
 
+    # Update the arc angles, the parts of the arcs which have moved by at
+    # least one pixel since they were last drawn are scheduled for repainting
     def update_times(self, elapsed, remaining, interval_elapsed,
                      interval_remaining):
         self.angle_remaining = (remaining / (elapsed+remaining)
@@ -279,40 +576,115 @@ class CountDown(QtWidgets.QWidget):
             interval_remaining / (interval_elapsed+interval_remaining)
             * self._TOTAL_ANGLE)
 
+        # Angle subtended by one pixel of the outer arc
+        pixel_angle = self._TOTAL_ANGLE / (pi * self.width())
+
+        angles = (self.angle_remaining, self.angle_interval_remaining)
+        drawn_angles = list(self._drawn_angles)
+        for i, (rect, angle) in enumerate(zip(self._arc_rects(), angles)):
+            # Smaller movements accumulate until the arc is repainted
+            if abs(angle - drawn_angles[i]) >= pixel_angle:
+                self.update(self._sector_rect(rect, drawn_angles[i], angle))
+                drawn_angles[i] = angle
+        self._drawn_angles = tuple(drawn_angles)
+
+    # Time taken for the arc of an interval of the given length to move by
+    # one pixel
+    def pixel_time(self, length):
+        return length / (pi * self.width())
+
     def addWidget(self, *args):
         self.vbox.addWidget(*args)
 
-    def paintEvent(self, e):
-        width, height = self.size().width(), self.size().height()
-
-        painter = QtGui.QPainter()
-        painter.begin(self)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
-
-        # Total time arc
-        painter.setPen(self.pen_total)
-        painter.drawArc(self._HALF_PEN_WIDTH,
-                        self._HALF_PEN_WIDTH,
-                        width-self._PEN_WIDTH,
-                        height-self._PEN_WIDTH,
-                        0, self.angle_remaining)
-
-        # Interval time arc
-        painter.setPen(self.pen_interval)
-        painter.drawArc(self._PEN_WIDTH+self._HALF_PEN_WIDTH,
-                        self._PEN_WIDTH+self._HALF_PEN_WIDTH,
-                        width-3*self._PEN_WIDTH,
-                        height-3*self._PEN_WIDTH,
-                        0, self.angle_interval_remaining)
+    # Rectangles bounding the total time and interval time arcs
+    def _arc_rects(self):
+        width, height = self.width(), self.height()
+        return (
+            QtCore.QRectF(self._HALF_PEN_WIDTH,
+                          self._HALF_PEN_WIDTH,
+                          width-self._PEN_WIDTH,
+                          height-self._PEN_WIDTH),
+            QtCore.QRectF(self._PEN_WIDTH+self._HALF_PEN_WIDTH,
+                          self._PEN_WIDTH+self._HALF_PEN_WIDTH,
+                          width-3*self._PEN_WIDTH,
+                          height-3*self._PEN_WIDTH))
+
+    # Rectangle bounding the part of an arc between two angles
+    def _sector_rect(self, rect, start, end):
+        start, end = sorted((start, end))
+        # Include the extremes of the circle between the two angles
+        quarter = self._TOTAL_ANGLE // 4
+        angles = [start, end] + [
+            angle for angle in range(0, self._TOTAL_ANGLE+1, quarter)
+            if start < angle < end]
+
+        xs, ys = [], []
+        centre = rect.center()
+        for radius in (-self._HALF_PEN_WIDTH, self._HALF_PEN_WIDTH):
+            half_width = rect.width()/2 + radius
+            half_height = rect.height()/2 + radius
+            for angle in angles:
+                theta = angle/16 * pi/180
+                xs.append(centre.x() + half_width*cos(theta))
+                ys.append(centre.y() - half_height*sin(theta))
+
+        return QtCore.QRectF(
+            QtCore.QPointF(min(xs), min(ys)),
+            QtCore.QPointF(max(xs), max(ys))).toAlignedRect().adjusted(
+                -1, -1, 1, 1)
+
+    # Render the full rings which arcs are cut from
+    def _render_rings(self):
+        ratio = self.devicePixelRatioF()
+        self._rings = []
+        for pen, rect in zip((self.pen_total, self.pen_interval),
+                             self._arc_rects()):
+            pixmap = QtGui.QPixmap(self.size() * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(QtCore.Qt.transparent)
+
+            painter = QtGui.QPainter(pixmap)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+            painter.setPen(pen)
+            painter.drawEllipse(rect)
+            painter.end()
+
+            self._rings.append((pixmap, rect))
+
+    def resizeEvent(self, e):
+        self._render_rings()
+        super().resizeEvent(e)
 
+    def paintEvent(self, e):
+        begin = perf_counter()
+
+        if self._rings is None:
+            self._render_rings()
+
+        # Cut each arc from its ring, painting is limited to the region
+        # scheduled for updating
+        painter = QtGui.QPainter(self)
+        angles = (self.angle_remaining, self.angle_interval_remaining)
+        for (pixmap, rect), angle in zip(self._rings, angles):
+            outer = rect.adjusted(-self._PEN_WIDTH, -self._PEN_WIDTH,
+                                  self._PEN_WIDTH, self._PEN_WIDTH)
+            sector = QtGui.QPainterPath(outer.center())
+            sector.arcTo(outer, 0, angle/16)
+            sector.closeSubpath()
+
+            painter.setClipPath(sector)
+            painter.drawPixmap(0, 0, pixmap)
         painter.end()
 
+        self.paint_time = perf_counter() - begin
+        if self.stats is not None:
+            self.stats.record(_PHASE_PAINT, round(self.paint_time * 1e9))
+
 
 class UpcomingIntervals(QtWidgets.QWidget):
     def __init__(self, parent):
         super().__init__(parent)
 
-        self._UPCOMING_INTERVALS_DISPLAYED = 8
         self.workout = self.parentWidget().workout
         font_upcoming_header = self.parentWidget().font_upcoming_header
 
@@ -326,23 +698,114 @@ class UpcomingIntervals(QtWidgets.QWidget):
         self.vbox_upcoming.addWidget(self.label_upcoming,
                                      QtCore.Qt.AlignCenter)
 
-        # Upcoming interval labels
-        self.label_upcoming_intervals = [
-            QtWidgets.QLabel()
-            for i in range(self._UPCOMING_INTERVALS_DISPLAYED)]
-        for label in self.label_upcoming_intervals:
-            self.vbox_upcoming.addWidget(label, QtCore.Qt.AlignCenter)
-        self.write_upcoming_intervals()
-
-    # Write the names of upcoming intervals to the upcoming vbox layout
+        # List of the rest of the workout, only the rows scrolled to are read
+        self.model = UpcomingModel(self.workout, self)
+        self.list_upcoming = QtWidgets.QListView(self)
+        self.list_upcoming.setModel(self.model)
+        self.list_upcoming.setUniformItemSizes(True)
+        self.list_upcoming.setSelectionMode(
+            QtWidgets.QAbstractItemView.NoSelection)
+        # Leave the arrow keys to the seek shortcuts
+        self.list_upcoming.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.list_upcoming.setMinimumWidth(320)
+        self.vbox_upcoming.addWidget(self.list_upcoming)
+
+    # Show the intervals following the current interval
     def write_upcoming_intervals(self):
-        # Get upcoming intervals up to the display limit
-        upcoming = self.workout.upcoming()[:self._UPCOMING_INTERVALS_DISPLAYED]
-
-        # Set labels of upcoming intevals up to the display limit
-        for label, interval in zip(self.label_upcoming_intervals, upcoming):
-            label.setText(interval.text)
-        # Blank the remainder of the labels if the number displayed is greater
-        # than the number of intervals remaining
-        for label in self.label_upcoming_intervals[len(upcoming):]:
-            label.setText('')
+        self.model.reset()
+        self.list_upcoming.scrollToTop()
+
+
+# The intervals following the current interval as runs of repeated intervals
+# and blocks, see Workout.iter_upcoming_runs
+#
+# Runs are read from the workout in batches as the list is scrolled and their
+# text is only formatted when displayed, so the cost of showing the list does
+# not depend on the length of the workout.
+class UpcomingModel(QtCore.QAbstractListModel):
+    def __init__(self, workout, parent=None):
+        super().__init__(parent)
+        self.workout = workout
+        # Descriptions of blocks, which are shared by every run of a block
+        self._block_texts = {}
+        self._runs = []
+        self._texts = []
+        self._source = iter(())
+        self._exhausted = True
+        self.reset()
+
+    # Read the upcoming runs again from the current interval
+    def reset(self):
+        self.beginResetModel()
+        self._runs = []
+        self._texts = []
+        self._source = self.workout.iter_upcoming_runs()
+        self._exhausted = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._runs)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        runs = list(islice(self._source, _FETCH_BATCH))
+        if len(runs) < _FETCH_BATCH:
+            self._exhausted = True
+        if runs:
+            first = len(self._runs)
+            self.beginInsertRows(QtCore.QModelIndex(), first,
+                                 first+len(runs)-1)
+            self._runs.extend(runs)
+            self._texts.extend([None] * len(runs))
+            self.endInsertRows()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        # Long descriptions are cut short in the list so are also shown as
+        # tool tips
+        roles = (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole)
+        if not index.isValid() or role not in roles:
+            return None
+        row = index.row()
+        text = self._texts[row]
+        if text is None:
+            run = self._runs[row]
+            text = self._entry_text(run.entry)
+            if run.repeats > 1:
+                text = '{}\u00d7 {}'.format(run.repeats, text)
+            self._texts[row] = text
+        return text
+
+    # Describe an interval, or a single repetition of a block
+    def _entry_text(self, entry):
+        if not isinstance(entry, Block):
+            return '{} {}'.format(entry.text, _length_text(entry.length))
+
+        text = self._block_texts.get(entry)
+        if text is None:
+            parts = []
+            for child in islice(entry.entries, _GROUP_ENTRIES):
+                part = self._entry_text(child)
+                if isinstance(child, Block) and child.repeats > 1:
+                    part = '{}\u00d7 {}'.format(child.repeats, part)
+                parts.append(part)
+            if len(entry.entries) > _GROUP_ENTRIES:
+                parts.append('\u2026')
+            text = '[{}]'.format(' / '.join(parts))
+            self._block_texts[entry] = text
+        return text
+
+
+# Format an interval length in seconds as minutes and seconds
+def _length_text(length):
+    minutes, seconds = divmod(length, 60)
+    if minutes and seconds:
+        return '{:g}m {:g}s'.format(minutes, seconds)
+    elif minutes:
+        return '{:g}m'.format(minutes)
+    return '{:g}s'.format(seconds)
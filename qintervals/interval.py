@@ -1,8 +1,11 @@
 from enum import Enum, auto
+from sys import intern
 
 
 # Interval class
 class Interval(object):
+    __slots__ = ('interval_type', 'text', 'length')
+
     def __init__(self, interval_type, text, length):
         if interval_type in IntervalType:
             self.interval_type = interval_type
@@ -11,7 +14,8 @@ class Interval(object):
                 'Invalid interval type provided {}'.format(interval_type))
 
         if isinstance(text, str):
-            self.text = text
+            # Repeated interval names share a single string
+            self.text = intern(text)
         else:
             raise TypeError('Arugment "text" must be a str')
 
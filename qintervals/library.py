@@ -0,0 +1,289 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from .batch import find_workouts
+from .block import Block
+from .cache import cache_key
+from .interval import IntervalType
+from .workout import Workout, WORKOUT_ERRORS, describe_error
+import os
+import sqlite3
+
+# Interval types, each has a column counting its intervals
+_TYPES = [interval_type.name for interval_type in IntervalType]
+
+# Catalogue schema, bump the version to rebuild older catalogues
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    error TEXT,
+    title TEXT,
+    total_time REAL,
+    intervals INTEGER,
+    blocks INTEGER,
+    {types}
+);
+CREATE INDEX IF NOT EXISTS workouts_total_time ON workouts (total_time);
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+""".format(types=',\n    '.join('{} INTEGER'.format(name) for name in _TYPES))
+
+# Columns of a parsed workout, in the order summaries are returned by workers
+_SUMMARY_COLUMNS = (['valid', 'error', 'title', 'total_time', 'intervals',
+                     'blocks'] + _TYPES)
+_ENTRY_COLUMNS = ['id', 'path', 'hash', 'title', 'total_time', 'intervals',
+                  'blocks'] + _TYPES
+
+# Fewer changed files than this are parsed in this process, starting workers
+# would take longer
+_MIN_POOL_FILES = 16
+
+# A valid workout in the catalogue, types holds the number of intervals of
+# each type by name
+Entry = namedtuple('Entry', ['id', 'path', 'hash', 'title', 'total_time',
+                             'intervals', 'blocks', 'types'])
+# Outcome of a scan, the numbers of files parsed, files whose contents are
+# unchanged, entries removed as their files no longer exist and invalid files
+# parsed
+ScanResult = namedtuple('ScanResult', ['parsed', 'unchanged', 'removed',
+                                       'invalid'])
+
+
+# Path of the catalogue used when none is given
+def library_path():
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(
+        os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'qintervals', 'library.sqlite')
+
+
+# Catalogue of the workout files found in a set of directories
+#
+# The title, length, interval and block counts and content hash of each file
+# are kept in an SQLite database so the library may be searched without
+# reading any workout files. Rescanning only reads files whose modification
+# time or size has changed, and only parses those whose contents have also
+# changed, spreading the work across a pool of processes.
+class Library(object):
+    def __init__(self, path=None):
+        if path is None:
+            path = library_path()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self._create()
+
+    def _create(self):
+        version, = self.connection.execute('PRAGMA user_version').fetchone()
+        with self.connection:
+            if version != _SCHEMA_VERSION:
+                self.connection.executescript(
+                    'DROP TABLE IF EXISTS workouts;'
+                    ' DROP TABLE IF EXISTS roots;')
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(
+                'PRAGMA user_version = {}'.format(_SCHEMA_VERSION))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Directories and files which have been scanned
+    def roots(self):
+        return [path for path, in self.connection.execute(
+            'SELECT path FROM roots ORDER BY path')]
+
+    # Bring the catalogue up to date with workout files and directories, or
+    # with the paths scanned before if none are given. Entries for files
+    # which are no longer found under the scanned paths are removed.
+    def scan(self, paths=None, jobs=None, chunksize=None):
+        if paths is None:
+            paths = self.roots()
+        paths = [os.path.abspath(path) for path in paths]
+
+        known = {path: (mtime_ns, size, digest)
+                 for path, mtime_ns, size, digest in self.connection.execute(
+                     'SELECT path, mtime_ns, size, hash FROM workouts')}
+
+        found = set()
+        changed = []
+        for path in find_workouts(paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.add(path)
+            previous = known.get(path)
+            if previous is None:
+                changed.append((path, stat.st_mtime_ns, stat.st_size, None))
+            elif previous[:2] != (stat.st_mtime_ns, stat.st_size):
+                changed.append((path, stat.st_mtime_ns, stat.st_size,
+                                previous[2]))
+
+        missing = [path for path in known
+                   if path not in found and _under(path, paths)]
+
+        parsed = invalid = 0
+        unchanged = len(found) - len(changed)
+        with self.connection:
+            for record in _summarise_all(changed, jobs, chunksize):
+                if record is None:
+                    continue
+                path, mtime_ns, size, digest, summary = record
+                if summary is None:
+                    # Only the modification time changed
+                    unchanged += 1
+                    self.connection.execute(
+                        'UPDATE workouts SET mtime_ns = ?, size = ?'
+                        ' WHERE path = ?', (mtime_ns, size, path))
+                    continue
+
+                parsed += 1
+                if not summary[0]:
+                    invalid += 1
+                self._store(path, mtime_ns, size, digest, summary)
+
+            self.connection.executemany(
+                'DELETE FROM workouts WHERE path = ?',
+                [(path,) for path in missing])
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO roots (path) VALUES (?)',
+                [(path,) for path in paths])
+
+        return ScanResult(parsed, unchanged, len(missing), invalid)
+
+    def _store(self, path, mtime_ns, size, digest, summary):
+        columns = ['path', 'mtime_ns', 'size', 'hash'] + _SUMMARY_COLUMNS
+        self.connection.execute(
+            'INSERT INTO workouts ({}) VALUES ({})'
+            ' ON CONFLICT (path) DO UPDATE SET {}'.format(
+                ', '.join(columns), ', '.join('?' for _ in columns),
+                ', '.join('{0} = excluded.{0}'.format(column)
+                          for column in columns[1:])),
+            (path, mtime_ns, size, digest) + tuple(summary))
+
+    # Find valid workouts whose title or path contains text, ignoring case,
+    # lasting between min_time and max_time seconds inclusive and containing
+    # intervals of a type, ordered by length. Every condition is optional.
+    def search(self, text=None, min_time=None, max_time=None,
+               interval_type=None, limit=None):
+        conditions = ['valid']
+        parameters = []
+        if text:
+            conditions.append("(title LIKE ? ESCAPE '\\'"
+                              " OR path LIKE ? ESCAPE '\\')")
+            pattern = '%{}%'.format(text.replace('\\', '\\\\')
+                                    .replace('%', '\\%').replace('_', '\\_'))
+            parameters += [pattern, pattern]
+        if min_time is not None:
+            conditions.append('total_time >= ?')
+            parameters.append(min_time)
+        if max_time is not None:
+            conditions.append('total_time <= ?')
+            parameters.append(max_time)
+        if interval_type is not None:
+            # Only known type names are used as column names
+            conditions.append('{} > 0'.format(
+                IntervalType[interval_type].name))
+
+        query = 'SELECT {} FROM workouts WHERE {} ORDER BY total_time, title'
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        rows = self.connection.execute(
+            query.format(', '.join(_ENTRY_COLUMNS), ' AND '.join(conditions)),
+            parameters)
+        return [_entry(row) for row in rows]
+
+    # The entry with an id, or None
+    def get(self, entry_id):
+        row = self.connection.execute(
+            'SELECT {} FROM workouts WHERE valid AND id = ?'.format(
+                ', '.join(_ENTRY_COLUMNS)), (entry_id,)).fetchone()
+        if row is not None:
+            return _entry(row)
+
+    # Files which could not be read as workouts, as (path, error) tuples
+    def invalid(self):
+        return list(self.connection.execute(
+            'SELECT path, error FROM workouts WHERE NOT valid ORDER BY path'))
+
+
+def _entry(row):
+    n_fixed = len(Entry._fields) - 1
+    return Entry(*row[:n_fixed], types=dict(zip(_TYPES, row[n_fixed:])))
+
+
+# Whether a path is one of, or inside one of, a list of paths
+def _under(path, roots):
+    return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+               for root in roots)
+
+
+# Summarise changed files in order, in a pool of processes when there are
+# enough of them
+def _summarise_all(changed, jobs=None, chunksize=None):
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(changed) < _MIN_POOL_FILES:
+        yield from map(_summarise, changed)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(changed) // (jobs*4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_summarise, changed, chunksize=chunksize)
+
+
+# Read a changed file and, if its contents have changed, parse it
+#
+# Returns the path, modification time, size and hash of the file and a tuple
+# of values for _SUMMARY_COLUMNS, or None for the summary if the contents are
+# unchanged. Returns None if the file can no longer be read.
+def _summarise(item):
+    path, mtime_ns, size, previous_digest = item
+    try:
+        with open(path, 'rb') as stream:
+            yaml_bytes = stream.read()
+    except OSError:
+        return None
+
+    digest = cache_key(yaml_bytes)
+    if digest == previous_digest:
+        return path, mtime_ns, size, digest, None
+
+    stream = BytesIO(yaml_bytes)
+    stream.name = path
+    workout = Workout()
+    try:
+        workout.from_yaml(stream)
+    except WORKOUT_ERRORS as error:
+        summary = ((False, describe_error(error))
+                   + (None,) * (len(_SUMMARY_COLUMNS) - 2))
+        return path, mtime_ns, size, digest, summary
+
+    counts = workout.schedule.type_counts()
+    summary = ((True, None, str(workout.name), workout.total_time,
+                len(workout.intervals), _count_blocks(workout.schedule))
+               + tuple(counts[interval_type]
+                       for interval_type in IntervalType))
+    return path, mtime_ns, size, digest, summary
+
+
+# Number of blocks written in a schedule, repetitions are not counted
+def _count_blocks(block):
+    return sum(1 + _count_blocks(entry) for entry in block.entries
+               if isinstance(entry, Block))
@@ -0,0 +1,166 @@
+from collections.abc import Sequence
+from hashlib import sha256
+from itertools import islice
+from threading import Lock
+from weakref import WeakValueDictionary
+from .block import Block
+import struct
+
+# Records hashed to identify a plan, the title and each interval and block
+_TITLE = struct.Struct('<BI')
+_INTERVAL = struct.Struct('<BBdI')
+_BLOCK = struct.Struct('<BI?I')
+_TITLE_RECORD = 0
+_INTERVAL_RECORD = 1
+_BLOCK_RECORD = 2
+
+
+# The title and schedule of a workout
+#
+# A plan is built by appending intervals and blocks and is then frozen, after
+# which it must not be changed. A frozen plan may be followed by any number of
+# workouts, in any thread, without being copied. Plans are equal when their
+# titles and schedules are the same and frozen plans are hashable.
+class Plan(object):
+    __slots__ = ('_name', '_schedule', '_intervals', '_frozen', '_digest',
+                 '__weakref__')
+
+    def __init__(self, name='', entries=()):
+        self._name = name
+        self._schedule = Block(entries)
+        self._intervals = _Intervals(self._schedule)
+        self._frozen = False
+        self._digest = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._check_not_frozen()
+        self._name = name
+
+    # Top level intervals and blocks
+    @property
+    def schedule(self):
+        return self._schedule
+
+    # Sequence of every interval, blocks are expanded on demand
+    @property
+    def intervals(self):
+        return self._intervals
+
+    @property
+    def total_time(self):
+        return self._schedule.length
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    # Add an interval or block to the end of the schedule
+    def append(self, entry):
+        self._check_not_frozen()
+        self._schedule.append(entry)
+
+    # Prevent any further changes, returns the plan
+    def freeze(self):
+        self._frozen = True
+        return self
+
+    # A plan which is not frozen with the same title and schedule
+    # Intervals and blocks are shared with this plan, only the list of top
+    # level entries is copied.
+    def copy(self):
+        return Plan(self._name, self._schedule.entries)
+
+    # Digest of the title and schedule, blocks are hashed once rather than for
+    # each repetition
+    def digest(self):
+        if self._digest is not None:
+            return self._digest
+
+        digest = sha256()
+        name = str(self._name).encode()
+        digest.update(_TITLE.pack(_TITLE_RECORD, len(name)))
+        digest.update(name)
+        for entry in self._schedule.entries:
+            _update_digest(digest, entry)
+        digest = digest.digest()
+
+        # A plan may still change until it is frozen
+        if self._frozen:
+            self._digest = digest
+        return digest
+
+    def __eq__(self, other):
+        if not isinstance(other, Plan):
+            return NotImplemented
+        return self is other or self.digest() == other.digest()
+
+    def __hash__(self):
+        if not self._frozen:
+            raise TypeError('Plans are only hashable once frozen')
+        return hash(self.digest())
+
+    def _check_not_frozen(self):
+        if self._frozen:
+            raise AttributeError('Frozen plans may not be changed')
+
+
+def _update_digest(digest, entry):
+    if isinstance(entry, Block):
+        digest.update(_BLOCK.pack(_BLOCK_RECORD, entry.repeats,
+                                  entry.skip_last_rest, len(entry.entries)))
+        for child in entry.entries:
+            _update_digest(digest, child)
+    else:
+        text = entry.text.encode()
+        digest.update(_INTERVAL.pack(_INTERVAL_RECORD,
+                                     entry.interval_type.value, entry.length,
+                                     len(text)))
+        digest.update(text)
+
+
+# Frozen plans in use in this process, by digest, so that equal plans are
+# stored once. Keys are digests rather than plans so that plans are only held
+# weakly.
+_plans = WeakValueDictionary()
+_plans_lock = Lock()
+
+
+# Freeze a plan and return the equal plan already in use, or the plan itself
+# if there is none
+def intern_plan(plan):
+    plan.freeze()
+    with _plans_lock:
+        return _plans.setdefault(plan.digest(), plan)
+
+
+# Read only sequence of the intervals in a workout, blocks are expanded on
+# demand
+class _Intervals(Sequence):
+    def __init__(self, schedule):
+        self._schedule = schedule
+
+    def __len__(self):
+        return self._schedule.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step < 0:
+                return [self[i] for i in range(start, stop, step)]
+            return list(islice(self._schedule.iter_intervals(start), 0,
+                               max(stop-start, 0), step))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Interval index out of range')
+        interval, _ = self._schedule.interval_at(index)
+        return interval
+
+    def __iter__(self):
+        return self._schedule.iter_intervals()
@@ -0,0 +1,475 @@
+from . import cache
+from .clock import MonotonicClock, to_seconds
+from .workout import Workout, WorkoutState, WORKOUT_ERRORS, describe_error
+from collections import deque
+from functools import partial
+import asyncio
+import heapq
+import json
+import os
+import sys
+import tempfile
+
+# Name of the socket the server listens on unless another path is given
+_SOCKET_NAME = 'qintervals.sock'
+
+# Address the server listens on when serving over TCP
+_HOST = '127.0.0.1'
+
+# Requests which act on a single session
+_SESSION_COMMANDS = ('close', 'start', 'pause', 'stop', 'progress', 'watch')
+
+
+# Error in a request made to the session server
+class SessionError(Exception):
+    pass
+
+
+# Default path of the server socket
+def socket_path():
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, _SOCKET_NAME)
+
+
+# A workout followed by one bike
+class _Session(object):
+    __slots__ = ('id', 'workout', 'index', 'generation', 'queued')
+
+    def __init__(self, session_id, workout):
+        self.id = session_id
+        self.workout = workout
+        # Index of the interval watchers were last told about
+        self.index = 0
+        # Incremented whenever the session's boundary is rescheduled, so that
+        # earlier entries in the boundary queue can be recognised as stale
+        self.generation = 0
+        # Whether the session has a current entry in the boundary queue
+        self.queued = False
+
+
+# Many concurrent workouts driven by a single timer
+#
+# Each workout file is loaded once and every session following it shares its
+# plan, so a session costs the same memory however long the workout is.
+# The times at which the current intervals of running sessions end are kept
+# in a heap and a single event loop timer is set for the earliest, so nothing
+# runs between interval boundaries. When a boundary passes the session's
+# progress is updated and any clients watching it are sent an event.
+class SessionManager(object):
+    def __init__(self, clock=None, cache_dir=None):
+        if clock is None:
+            clock = MonotonicClock()
+        self.clock = clock
+        self.cache_dir = cache_dir
+
+        self.sessions = {}
+        self._next_id = 1
+        # Plans of loaded workouts and the modification times of their files,
+        # by path
+        self._plans = {}
+
+        # Heap of (boundary, generation, session id), entries for sessions
+        # which have been rescheduled or closed are skipped when they expire
+        self._boundaries = []
+        self._stale = 0
+        self._timer = None
+        self._timer_due = None
+
+        # Writers of clients watching each session and the sessions each
+        # writer is watching
+        self._watchers = {}
+        self._watching = {}
+
+    # Open a session following a workout file, returns the session id
+    def open(self, workout_file):
+        key = os.path.realpath(workout_file)
+        mtime = os.stat(key).st_mtime
+        loaded = self._plans.get(key)
+        if loaded is None or loaded[0] != mtime:
+            loaded = (mtime, cache.load_plan(key, directory=self.cache_dir))
+            self._plans[key] = loaded
+
+        session = _Session(self._next_id,
+                           Workout(plan=loaded[1], clock=self.clock))
+        self.sessions[session.id] = session
+        self._next_id += 1
+        return session.id
+
+    # Close a session
+    def close(self, session_id):
+        session = self._session(session_id)
+        del self.sessions[session_id]
+        self._invalidate(session)
+        for writer in self._watchers.pop(session_id, ()):
+            self._watching[writer].discard(session_id)
+
+    def start(self, session_id):
+        session = self._session(session_id)
+        session.workout.start()
+        self._reschedule(session)
+
+    def pause(self, session_id):
+        session = self._session(session_id)
+        session.workout.pause()
+        self._reschedule(session)
+
+    def stop(self, session_id):
+        session = self._session(session_id)
+        session.workout.stop()
+        session.index = 0
+        self._reschedule(session)
+
+    # Progress of a session as a dictionary which may be written as JSON
+    def progress(self, session_id):
+        workout = self._session(session_id).workout
+        progress = workout.progress()
+        position = workout.current_position()
+        return {
+            'state': workout.state.name,
+            'elapsed': progress.elapsed,
+            'remaining': progress.remaining,
+            'interval_elapsed': progress.interval_elapsed,
+            'interval_remaining': progress.interval_remaining,
+            'index': position.index,
+            'interval': progress.interval.text,
+            'type': progress.interval.interval_type.name
+        }
+
+    # Summaries of all sessions
+    def list_sessions(self):
+        return [{'session': session.id,
+                 'title': str(session.workout.name),
+                 'state': session.workout.state.name}
+                for session in self.sessions.values()]
+
+    # Send events for a session to writer, a stream with write and
+    # is_closing methods
+    def watch(self, session_id, writer):
+        self._session(session_id)
+        self._watchers.setdefault(session_id, set()).add(writer)
+        self._watching.setdefault(writer, set()).add(session_id)
+
+    # Stop sending events to writer
+    def unwatch(self, writer):
+        for session_id in self._watching.pop(writer, ()):
+            self._watchers[session_id].discard(writer)
+            if not self._watchers[session_id]:
+                del self._watchers[session_id]
+
+    # Handle a request from a client, returns the response
+    def handle(self, request, writer=None):
+        try:
+            command = request['command']
+            if command == 'open':
+                result = {'session': self.open(request['workout'])}
+            elif command == 'sessions':
+                result = {'sessions': self.list_sessions()}
+            elif command in _SESSION_COMMANDS:
+                session_id = request['session']
+                if command == 'progress':
+                    result = self.progress(session_id)
+                elif command == 'watch':
+                    if writer is None:
+                        raise SessionError('Nowhere to send events')
+                    self.watch(session_id, writer)
+                    result = {}
+                else:
+                    getattr(self, command)(session_id)
+                    result = {}
+            else:
+                raise SessionError('Unknown command: {}'.format(command))
+        except KeyError as error:
+            return {'ok': False,
+                    'error': 'Request missing key: {}'.format(error)}
+        except ((SessionError,) + WORKOUT_ERRORS) as error:
+            return {'ok': False, 'error': describe_error(error)}
+
+        result['ok'] = True
+        return result
+
+    # Update the sessions whose boundaries have passed and set the timer for
+    # the next boundary
+    def expire(self):
+        self._timer = None
+        self._timer_due = None
+
+        # Rescheduling a session may rebuild the queue so it is not held in a
+        # local variable
+        now = self.clock.now()
+        while self._boundaries and self._boundaries[0][0] <= now:
+            _, generation, session_id = heapq.heappop(self._boundaries)
+            session = self.sessions.get(session_id)
+            if session is None or session.generation != generation:
+                self._stale -= 1
+                continue
+            session.queued = False
+            self._advance(session)
+
+        self._arm()
+
+    def _session(self, session_id):
+        try:
+            return self.sessions[session_id]
+        except (KeyError, TypeError):
+            raise SessionError('No such session: {}'.format(session_id))
+
+    # Bring a session up to date after its boundary has passed
+    def _advance(self, session):
+        workout = session.workout
+        progress = workout.progress()
+        if workout.state == WorkoutState.stopped:
+            session.index = 0
+            self._notify(session, {'event': 'finished'})
+        else:
+            position = workout.current_position()
+            if position.index != session.index:
+                session.index = position.index
+                self._notify(session, {
+                    'event': 'interval',
+                    'index': position.index,
+                    'interval': progress.interval.text,
+                    'type': progress.interval.interval_type.name,
+                    'length': progress.interval.length
+                })
+        self._reschedule(session)
+
+    # Replace a session's entry in the boundary queue
+    def _reschedule(self, session):
+        self._invalidate(session)
+        boundary = session.workout.boundary()
+        if boundary is not None:
+            heapq.heappush(self._boundaries,
+                           (boundary, session.generation, session.id))
+            session.queued = True
+        self._arm()
+
+    # Mark a session's entry in the boundary queue as stale, the queue is
+    # rebuilt once most of it is stale
+    def _invalidate(self, session):
+        session.generation += 1
+        if not session.queued:
+            return
+        session.queued = False
+        self._stale += 1
+        if self._stale > len(self._boundaries) // 2:
+            self._boundaries = [
+                entry for entry in self._boundaries
+                if entry[2] in self.sessions
+                and self.sessions[entry[2]].generation == entry[1]]
+            heapq.heapify(self._boundaries)
+            self._stale = 0
+
+    # Set the timer for the earliest boundary
+    def _arm(self):
+        if not self._boundaries:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+                self._timer_due = None
+            return
+
+        due = self._boundaries[0][0]
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+
+        delay = max(to_seconds(due - self.clock.now()), 0)
+        self._timer = asyncio.get_running_loop().call_later(delay,
+                                                            self.expire)
+        self._timer_due = due
+
+    def _notify(self, session, event):
+        writers = self._watchers.get(session.id)
+        if not writers:
+            return
+        event['session'] = session.id
+        line = _encode(event)
+        for writer in list(writers):
+            if writer.is_closing():
+                self.unwatch(writer)
+            else:
+                writer.write(line)
+
+
+def _encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+# Start serving requests from clients on a unix socket, or a TCP port on the
+# loopback interface if port is given. Requests and responses are JSON
+# objects, one per line.
+async def start_server(manager, path=None, port=None):
+    handler = partial(_serve_connection, manager)
+    if port is not None:
+        return await asyncio.start_server(handler, _HOST, port)
+
+    if path is None:
+        path = socket_path()
+    # Remove a socket left behind by a server which did not shut down cleanly
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    return await asyncio.start_unix_server(handler, path)
+
+
+async def _serve_connection(manager, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request is not an object')
+            except ValueError as error:
+                response = {'ok': False,
+                            'error': 'Invalid request: {}'.format(error)}
+            else:
+                response = manager.handle(request, writer)
+            writer.write(_encode(response))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        manager.unwatch(writer)
+        writer.close()
+
+
+# Run a session server until interrupted
+def serve(path=None, port=None, cache_dir=None):
+    async def run():
+        server = await start_server(SessionManager(cache_dir=cache_dir),
+                                    path, port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+# Client of a session server
+class Client(object):
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        # Events received while waiting for a response
+        self._events = deque()
+
+    @classmethod
+    async def connect(cls, path=None, port=None):
+        if port is not None:
+            reader, writer = await asyncio.open_connection(_HOST, port)
+        else:
+            if path is None:
+                path = socket_path()
+            reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    # Send a request and wait for the response, raises SessionError if the
+    # request failed
+    async def request(self, command, **arguments):
+        arguments['command'] = command
+        self._writer.write(_encode(arguments))
+        await self._writer.drain()
+
+        while True:
+            message = await self._read()
+            if 'event' in message:
+                self._events.append(message)
+            elif message['ok']:
+                return message
+            else:
+                raise SessionError(message['error'])
+
+    # Wait for the next event from a watched session
+    async def next_event(self):
+        if self._events:
+            return self._events.popleft()
+        return await self._read()
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def _read(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        return json.loads(line)
+
+
+# Stand in for a class of bikes, open n sessions following a workout file,
+# start them all and write each event as a JSON line until every session has
+# finished
+async def run_class(client, workout_file, n, stream=None):
+    if stream is None:
+        stream = sys.stdout
+
+    sessions = set()
+    for _ in range(n):
+        response = await client.request('open', workout=workout_file)
+        sessions.add(response['session'])
+    for session_id in sessions:
+        await client.request('watch', session=session_id)
+    for session_id in sessions:
+        await client.request('start', session=session_id)
+
+    while sessions:
+        event = await client.next_event()
+        stream.write(json.dumps(event) + '\n')
+        stream.flush()
+        if event['event'] == 'finished':
+            sessions.discard(event['session'])
+            await client.request('close', session=event['session'])
+
+
+# Send a single request to a server and write the response as a JSON line,
+# the 'class' command runs run_class instead. Returns the exit status.
+def client(command, arguments, path=None, port=None, stream=None):
+    if stream is None:
+        stream = sys.stdout
+
+    async def run():
+        connection = await Client.connect(path, port)
+        try:
+            if command == 'class':
+                workout_file, n = arguments
+                await run_class(connection, os.path.abspath(workout_file),
+                                int(n), stream)
+                return
+            elif command == 'open':
+                (workout_file,) = arguments
+                request = {'workout': os.path.abspath(workout_file)}
+            elif command == 'sessions':
+                request = {}
+            else:
+                (session_id,) = arguments
+                request = {'session': int(session_id)}
+
+            response = await connection.request(command, **request)
+            stream.write(json.dumps(response) + '\n')
+            if command == 'watch':
+                while True:
+                    event = await connection.next_event()
+                    stream.write(json.dumps(event) + '\n')
+                    stream.flush()
+                    if event['event'] == 'finished':
+                        break
+        finally:
+            await connection.close()
+
+    try:
+        asyncio.run(run())
+    except ValueError:
+        print('qintervals: error: wrong arguments for {}'.format(command),
+              file=sys.stderr)
+        return 2
+    except (SessionError, OSError) as error:
+        print('qintervals: error: {}'.format(error), file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,78 @@
+from collections import namedtuple
+from math import ceil
+from .clock import NS_PER_SECOND, VirtualClock
+from .workout import WorkoutState
+
+# Change of interval during a simulated workout
+Transition = namedtuple('Transition', ['time', 'index', 'interval'])
+# Progress of a simulated workout at a sampling time
+Sample = namedtuple('Sample', ['elapsed', 'remaining', 'interval_elapsed',
+                               'interval_remaining', 'index'])
+# Results of simulating a workout, the interval transitions in order, the
+# position and timings of each interval visited and progress samples
+Simulation = namedtuple('Simulation', ['transitions', 'timeline', 'samples'])
+
+
+# Replay a workout from start to finish against a virtual clock
+#
+# The clock jumps directly from one interval boundary, or sampling time, to
+# the next so a workout is simulated in time proportional to the number of
+# intervals and samples rather than its length. Progress is sampled at
+# sample_rate times per second, or not at all if sample_rate is None.
+def simulate(workout, sample_rate=None):
+    transitions = []
+    timeline = []
+    samples = []
+
+    # Run the workout from the beginning on a virtual clock
+    workout_clock = workout.clock
+    clock = VirtualClock()
+    workout.stop()
+    workout.clock = clock
+
+    try:
+        workout.start()
+        position = workout.current_position()
+        transitions.append(Transition(0.0, position.index, position.interval))
+        timeline.append(position)
+
+        if sample_rate is None:
+            sample_at = None
+        else:
+            n_samples = 0
+            sample_at = 0
+
+        while True:
+            # Move to the end of the current interval or the next sampling
+            # time, whichever is sooner. Always move forward in case rounding
+            # leaves the clock just short of a boundary.
+            boundary = max(ceil(position.ends_at*NS_PER_SECOND),
+                           clock.time+1)
+            sampling = sample_at is not None and sample_at <= boundary
+            if sampling:
+                clock.time = sample_at
+            else:
+                clock.time = boundary
+
+            progress = workout.progress()
+            if workout.state == WorkoutState.stopped:
+                break
+
+            if progress.changed_interval:
+                position = workout.current_position()
+                transitions.append(Transition(
+                    progress.elapsed, position.index, position.interval))
+                timeline.append(position)
+
+            if sampling:
+                samples.append(Sample(
+                    progress.elapsed, progress.remaining,
+                    progress.interval_elapsed, progress.interval_remaining,
+                    position.index))
+                n_samples += 1
+                sample_at = round(n_samples*NS_PER_SECOND/sample_rate)
+    finally:
+        workout.stop()
+        workout.clock = workout_clock
+
+    return Simulation(transitions, timeline, samples)
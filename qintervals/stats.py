@@ -0,0 +1,97 @@
+from array import array
+from time import perf_counter_ns
+import sys
+
+# Number of frames kept for each measurement
+DEFAULT_SIZE = 4096
+
+
+# Timings of the phases of each frame of the ui
+#
+# Durations are recorded in nanoseconds into fixed size ring buffers, one for
+# each phase, so recording a frame does not allocate. Phases are referred to
+# by their index in the list of phase names given when the recorder is
+# created. As well as the phase durations the lateness of each timed frame,
+# the time between when the frame was due and when it started, is recorded.
+# Frames drawn in response to the user, rather than a timer, were never due
+# so have no lateness.
+class FrameStats(object):
+    def __init__(self, phases, size=DEFAULT_SIZE):
+        self.phases = list(phases)
+        self.size = size
+        self._durations = [array('q', bytes(8*size)) for _ in self.phases]
+        self._counts = array('q', bytes(8*len(self.phases)))
+        self._lateness = array('q', bytes(8*size))
+        self.frames = 0
+        self.timed_frames = 0
+
+        self._due = None
+        self._marked_at = 0
+
+    # Record when the next frame is due, in nanoseconds from now
+    def expect(self, delay):
+        self._due = perf_counter_ns() + delay
+
+    # Start timing a frame, timed is false for frames not started by a timer
+    def begin_frame(self, timed=True):
+        now = perf_counter_ns()
+        if timed:
+            if self._due is not None:
+                lateness = now - self._due
+            else:
+                lateness = 0
+            self._lateness[self.timed_frames % self.size] = lateness
+            self.timed_frames += 1
+        self._due = None
+        self.frames += 1
+        self._marked_at = now
+
+    # Record the end of a phase of the current frame, the phase lasted from
+    # the previous mark or the start of the frame
+    def mark(self, phase):
+        now = perf_counter_ns()
+        self.record(phase, now - self._marked_at)
+        self._marked_at = now
+
+    # Record the duration of a phase timed elsewhere, in nanoseconds
+    def record(self, phase, duration):
+        count = self._counts[phase]
+        self._durations[phase][count % self.size] = duration
+        self._counts[phase] = count + 1
+
+    # Percentiles of the recorded durations of each phase and of frame
+    # lateness, in microseconds
+    def summary(self, percentiles=(50, 99)):
+        rows = []
+        for name, durations, count in zip(self.phases, self._durations,
+                                          self._counts):
+            rows.append((name, count,
+                         _percentiles(durations[:min(count, self.size)],
+                                      percentiles)))
+        rows.append(('frame lateness', self.timed_frames,
+                     _percentiles(self._lateness[:min(self.timed_frames,
+                                                      self.size)],
+                                  percentiles)))
+        return rows
+
+    # Write a table of the summary
+    def report(self, stream=None, percentiles=(50, 99)):
+        if stream is None:
+            stream = sys.stderr
+
+        header = ['phase', 'count'] + ['p{}'.format(percentile)
+                                       for percentile in percentiles]
+        print(('{:<16}{:>8}' + '{:>10}'*len(percentiles)).format(*header),
+              file=stream)
+        for name, count, values in self.summary(percentiles):
+            print(('{:<16}{:>8}' + '{:>8.0f}us'*len(percentiles)).format(
+                name, count, *values), file=stream)
+
+
+# Percentiles of a set of nanosecond durations, in microseconds
+def _percentiles(durations, percentiles):
+    ordered = sorted(durations)
+    if not ordered:
+        return [0.0 for _ in percentiles]
+    return [ordered[min(len(ordered)*percentile // 100, len(ordered)-1)]/1e3
+            for percentile in percentiles]
@@ -0,0 +1,313 @@
+from array import array
+from bisect import bisect_right
+from math import pi, sin
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+from .workout import WorkoutState
+import json
+import os
+import random
+import socket
+import struct
+import sys
+
+# Sensor channels, a sample's channel is sent as its index in this tuple
+CHANNELS = ('heart_rate', 'power', 'cadence')
+
+# Lower bounds of the zones of each channel after the first, which starts at
+# zero
+ZONES = {
+    'heart_rate': (100, 120, 140, 160, 180),
+    'power': (150, 200, 250, 300, 350, 450),
+    'cadence': (60, 80, 100)
+}
+
+# Samples kept for each channel
+DEFAULT_SIZE = 4096
+
+# Intervals whose aggregates are kept, older intervals are forgotten
+MAX_INTERVALS = 1000
+
+# Datagrams are a sequence of samples, each a channel index and a value
+_SAMPLE = struct.Struct('<Bf')
+_MAX_DATAGRAM = 65536
+# Samples sent in each datagram by the generator
+_DATAGRAM_SAMPLES = 1024
+
+# Time the receiver waits for data before checking whether it should stop, in
+# seconds
+_POLL = 0.2
+
+_HOST = '127.0.0.1'
+
+
+# Most recent samples of a channel
+#
+# Sample times, integer nanoseconds, and values are written into fixed size
+# rings so memory use does not grow however long samples are received. There
+# is a single writer and readers may run in other threads.
+class Ring(object):
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.times = array('q', bytes(8*size))
+        self.values = array('d', bytes(8*size))
+        # Number of samples ever written
+        self.count = 0
+
+    def append(self, time, value):
+        i = self.count % self.size
+        self.times[i] = time
+        self.values[i] = value
+        self.count += 1
+
+    # Most recent sample as a (time, value) tuple, or None if there are none
+    def latest(self):
+        count = self.count
+        if count == 0:
+            return None
+        i = (count-1) % self.size
+        return self.times[i], self.values[i]
+
+    # Samples held, oldest first, as lists of times and values
+    def samples(self):
+        count = self.count
+        n = min(count, self.size)
+        start = (count - n) % self.size
+        order = [(start + i) % self.size for i in range(n)]
+        return ([self.times[i] for i in order],
+                [self.values[i] for i in order])
+
+
+# Running aggregate of one channel over one interval
+class IntervalAggregate(object):
+    __slots__ = ('count', 'total', 'maximum', 'zone_time', '_last_time',
+                 '_last_zone')
+
+    def __init__(self, n_zones):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = None
+        # Time spent in each zone, in nanoseconds
+        self.zone_time = array('q', bytes(8*n_zones))
+        self._last_time = None
+        self._last_zone = None
+
+    # Add a sample, the time since the previous sample is counted in the zone
+    # of the previous sample
+    def add(self, time, value, zone):
+        if self._last_time is not None:
+            self.zone_time[self._last_zone] += time - self._last_time
+        self._last_time = time
+        self._last_zone = zone
+
+        self.count += 1
+        self.total += value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    # Summary as a dictionary which may be written as JSON, zone times in
+    # seconds
+    def summary(self):
+        return {
+            'samples': self.count,
+            'mean': self.mean,
+            'max': self.maximum,
+            'zones': [time/1e9 for time in self.zone_time]
+        }
+
+
+# Sensor samples recorded against a running workout
+#
+# Each sample is added to the ring of its channel and, while the workout is
+# running, to the aggregates of the interval it falls in. Intervals are
+# identified by their position in the workout, as repeated intervals may be
+# the same object. The interval is found from the workout's elapsed time and
+# frozen plan, which are safe to read from the receiving thread, and the last
+# position is kept so the schedule is only searched when the interval
+# changes.
+class Telemetry(object):
+    def __init__(self, workout, zones=None, size=DEFAULT_SIZE,
+                 max_intervals=MAX_INTERVALS):
+        self.workout = workout
+        if zones is None:
+            zones = ZONES
+        self.zones = [tuple(zones.get(channel, ())) for channel in CHANNELS]
+        self.rings = [Ring(size) for _ in CHANNELS]
+        self.max_intervals = max_intervals
+
+        # Aggregates of each channel by interval position, oldest first
+        self._aggregates = {}
+        self._lock = Lock()
+
+        # Position, starting and ending times of the last interval sampled
+        self._position = None
+
+    # Record a sample of a channel, given by its index in CHANNELS
+    def record(self, channel, value, time=None):
+        workout = self.workout
+        if time is None:
+            time = workout.clock.now()
+        self.rings[channel].append(time, value)
+
+        if workout.state != WorkoutState.running:
+            return
+        index = self._index(workout.elapsed())
+        if index is None:
+            return
+
+        aggregates = self._aggregates.get(index)
+        if aggregates is None:
+            aggregates = self._add_interval(index)
+        zones = self.zones[channel]
+        aggregates[channel].add(time, value, bisect_right(zones, value))
+
+    # Aggregates of each channel for the interval at a position, or None if
+    # no samples have been recorded for it
+    def aggregates(self, index):
+        return self._aggregates.get(index)
+
+    # Most recent value of a channel, or None
+    def latest(self, channel):
+        sample = self.rings[channel].latest()
+        if sample is not None:
+            return sample[1]
+
+    # Summaries of the intervals sampled, oldest first
+    def summary(self):
+        with self._lock:
+            items = list(self._aggregates.items())
+        return [dict({'index': index},
+                     **{channel: aggregate.summary()
+                        for channel, aggregate in zip(CHANNELS, aggregates)})
+                for index, aggregates in items]
+
+    # Write the summary as one JSON object per interval
+    def write_summary(self, stream=None):
+        if stream is None:
+            stream = sys.stdout
+        for summary in self.summary():
+            stream.write(json.dumps(summary) + '\n')
+
+    def _index(self, elapsed):
+        position = self._position
+        if position is not None and position[1] <= elapsed < position[2]:
+            return position[0]
+
+        schedule = self.workout.schedule
+        if not 0 <= elapsed < schedule.length:
+            return None
+        interval, index, starts_at = schedule.locate(elapsed)
+        self._position = (index, starts_at, starts_at+interval.length)
+        return index
+
+    def _add_interval(self, index):
+        aggregates = [IntervalAggregate(len(zones)+1) for zones in self.zones]
+        with self._lock:
+            self._aggregates[index] = aggregates
+            while len(self._aggregates) > self.max_intervals:
+                del self._aggregates[next(iter(self._aggregates))]
+        return aggregates
+
+
+# Parse a datagram of samples into (channel, value) tuples
+def parse(datagram):
+    end = len(datagram) - len(datagram) % _SAMPLE.size
+    return [(channel, value)
+            for channel, value in _SAMPLE.iter_unpack(datagram[:end])
+            if channel < len(CHANNELS)]
+
+
+# Encode (channel, value) tuples as a datagram
+def encode(samples):
+    return b''.join(_SAMPLE.pack(channel, value)
+                    for channel, value in samples)
+
+
+def _open_socket(port=None, path=None):
+    if port is not None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        return sock, (_HOST, port)
+    return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM), path
+
+
+# Receive sensor samples in a background thread
+#
+# Samples arrive as datagrams on a UDP port of the loopback interface or a
+# unix datagram socket and are recorded as soon as they are received, so the
+# ui thread only reads the results.
+class Receiver(object):
+    def __init__(self, telemetry, port=None, path=None):
+        self.telemetry = telemetry
+        self.socket, self.address = _open_socket(port, path)
+        self.socket.bind(self.address)
+        self.socket.settimeout(_POLL)
+        # Number of datagrams received
+        self.received = 0
+
+        self._stopping = Event()
+        self._thread = Thread(target=self._run, name='telemetry',
+                              daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    # Stop receiving and wait for the thread to finish, a unix socket is
+    # removed
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+        self.socket.close()
+        if isinstance(self.address, str):
+            os.unlink(self.address)
+
+    def _run(self):
+        record = self.telemetry.record
+        while not self._stopping.is_set():
+            try:
+                datagram = self.socket.recv(_MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.received += 1
+            for channel, value in parse(datagram):
+                record(channel, value)
+
+
+# Stand in for real sensors, send synthetic samples of every channel at rate
+# samples per second per channel for duration seconds, or until interrupted
+# if duration is None. Samples are sent in a datagram every period seconds.
+def generate(port=None, path=None, rate=1000, duration=None, period=0.01):
+    sock, address = _open_socket(port, path)
+    # Resting, peak and spread of each channel
+    shapes = [(60, 190, 3), (100, 400, 25), (70, 110, 5)]
+
+    begin = perf_counter()
+    sent = 0
+    try:
+        with sock:
+            while duration is None or perf_counter() - begin < duration:
+                elapsed = perf_counter() - begin
+                # Effort rises and falls over a minute
+                effort = (1 + sin(2*pi*elapsed/60)) / 2
+                due = int(elapsed*rate) - sent
+                samples = []
+                for channel, (low, high, spread) in enumerate(shapes):
+                    base = low + effort*(high-low)
+                    samples.extend(
+                        (channel, random.gauss(base, spread))
+                        for _ in range(due))
+                for i in range(0, len(samples), _DATAGRAM_SAMPLES):
+                    sock.sendto(encode(samples[i:i+_DATAGRAM_SAMPLES]),
+                                address)
+                sent += due
+                sleep(period)
+    except KeyboardInterrupt:
+        pass
+    return sent
@@ -0,0 +1,223 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate
+from math import ceil
+from .block import Block
+from .interval import IntervalType
+import csv
+import importlib
+import os
+import sys
+
+# NumPy is optional, without it timelines are built from stdlib arrays
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Progress of a workout sampled at regular times, each field a column with one
+# value per sample. Columns are NumPy arrays when NumPy is installed and
+# stdlib arrays otherwise. interval_type holds IntervalType values.
+Timeline = namedtuple('Timeline', ['elapsed', 'remaining', 'interval_elapsed',
+                                   'interval_remaining', 'index',
+                                   'interval_type'])
+
+# Names of interval types indexed by their values
+_TYPE_NAMES = [''] * (max(interval_type.value
+                          for interval_type in IntervalType) + 1)
+for interval_type in IntervalType:
+    _TYPE_NAMES[interval_type.value] = interval_type.name
+
+# File formats written by export, by extension
+FORMATS = {
+    '.csv': 'csv',
+    '.npz': 'npz',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.parquet': 'parquet'
+}
+
+
+# Error writing a timeline, such as an unknown format or one whose optional
+# dependency is not installed
+class ExportError(Exception):
+    pass
+
+
+# Sample the progress of a workout every resolution seconds from its start
+#
+# The length and type of every interval are expanded from the schedule a
+# block at a time, by repeating the columns of a single repetition, and the
+# interval of each sample is found by searching the interval end times. With
+# NumPy every column is computed by whole array operations.
+def timeline(schedule, resolution=1.0, use_numpy=None):
+    if resolution <= 0:
+        raise ValueError('Timeline resolution must be positive')
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError('NumPy is not installed')
+
+    lengths, types = _columns(schedule)
+    total = schedule.length
+    n_samples = ceil(total / resolution)
+    # Guard against rounding leaving a sample at the end of the workout
+    if n_samples > 0 and (n_samples-1)*resolution >= total:
+        n_samples -= 1
+
+    if use_numpy:
+        return _numpy_timeline(lengths, types, total, resolution, n_samples)
+    return _array_timeline(lengths, types, total, resolution, n_samples)
+
+
+# Length and type value of every interval in a block
+def _columns(block):
+    lengths = array('d')
+    types = array('b')
+    for entry in block.entries:
+        if isinstance(entry, Block):
+            entry_lengths, entry_types = _columns(entry)
+            lengths.extend(entry_lengths)
+            types.extend(entry_types)
+        else:
+            lengths.append(entry.length)
+            types.append(entry.interval_type.value)
+
+    if block.repeats != 1:
+        lengths *= block.repeats
+        types *= block.repeats
+    # Drop a skipped final rest
+    del lengths[block.count:]
+    del types[block.count:]
+    return lengths, types
+
+
+def _numpy_timeline(lengths, types, total, resolution, n_samples):
+    lengths = numpy.frombuffer(lengths, dtype=numpy.float64)
+    types = numpy.frombuffer(types, dtype=numpy.int8)
+    ends = numpy.cumsum(lengths)
+    starts = ends - lengths
+
+    elapsed = numpy.arange(n_samples, dtype=numpy.float64) * resolution
+    index = numpy.searchsorted(ends, elapsed, side='right')
+    numpy.minimum(index, len(ends)-1, out=index)
+
+    return Timeline(
+        elapsed=elapsed,
+        remaining=total - elapsed,
+        interval_elapsed=elapsed - starts[index],
+        interval_remaining=ends[index] - elapsed,
+        index=index.astype(numpy.int64),
+        interval_type=types[index]
+    )
+
+
+def _array_timeline(lengths, types, total, resolution, n_samples):
+    ends = array('d', accumulate(lengths))
+    columns = Timeline(array('d'), array('d'), array('d'), array('d'),
+                       array('q'), array('b'))
+
+    i = 0
+    ends_at = ends[0] if ends else 0.0
+    for sample in range(n_samples):
+        elapsed = sample*resolution
+        # Samples only move forward so the next interval is usually the
+        # right one
+        if elapsed >= ends_at:
+            i = min(bisect_right(ends, elapsed, i), len(ends)-1)
+            ends_at = ends[i]
+        columns.elapsed.append(elapsed)
+        columns.remaining.append(total - elapsed)
+        columns.interval_elapsed.append(elapsed - (ends_at - lengths[i]))
+        columns.interval_remaining.append(ends_at - elapsed)
+        columns.index.append(i)
+        columns.interval_type.append(types[i])
+    return columns
+
+
+# Write a timeline to a file, in the format given or the format implied by
+# the file's extension. '-' writes CSV to standard output.
+def export(timeline, path, file_format=None):
+    if file_format is None:
+        if path == '-':
+            file_format = 'csv'
+        else:
+            extension = os.path.splitext(path)[1].lower()
+            try:
+                file_format = FORMATS[extension]
+            except KeyError:
+                raise ExportError(
+                    'Unknown timeline format {}'.format(extension or path))
+
+    writers = {
+        'csv': write_csv,
+        'npz': write_npz,
+        'arrow': write_arrow,
+        'parquet': write_parquet
+    }
+    try:
+        writer = writers[file_format]
+    except KeyError:
+        raise ExportError('Unknown timeline format {}'.format(file_format))
+    writer(timeline, path)
+
+
+# Write a timeline as CSV with a header row, interval types are written by
+# name
+def write_csv(timeline, path):
+    if path == '-':
+        _write_csv(timeline, sys.stdout)
+    else:
+        with open(path, 'w', newline='') as stream:
+            _write_csv(timeline, stream)
+
+
+def _write_csv(timeline, stream):
+    writer = csv.writer(stream)
+    writer.writerow(Timeline._fields)
+    types = [_TYPE_NAMES[value] for value in timeline.interval_type]
+    writer.writerows(zip(*(column.tolist() for column in timeline[:-1]),
+                         types))
+
+
+# Write a timeline as a NumPy .npz archive of its columns, interval type
+# names are stored in type_names indexed by value
+def write_npz(timeline, path):
+    if numpy is None:
+        raise ExportError('Writing .npz files requires NumPy')
+    numpy.savez(path, type_names=numpy.array(_TYPE_NAMES),
+                **{name: numpy.asarray(column)
+                   for name, column in zip(Timeline._fields, timeline)})
+
+
+# Write a timeline as an Arrow IPC (Feather) file
+def write_arrow(timeline, path):
+    feather = _import_pyarrow('pyarrow.feather', 'Arrow')
+    feather.write_feather(_arrow_table(timeline), path)
+
+
+# Write a timeline as a Parquet file
+def write_parquet(timeline, path):
+    parquet = _import_pyarrow('pyarrow.parquet', 'Parquet')
+    parquet.write_table(_arrow_table(timeline), path)
+
+
+def _import_pyarrow(module, name):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise ExportError('Writing {} files requires pyarrow'.format(name))
+
+
+# Columns of a timeline as an Arrow table, interval types are dictionary
+# encoded by name
+def _arrow_table(timeline):
+    import pyarrow
+
+    columns = {name: pyarrow.array(column)
+               for name, column in zip(Timeline._fields[:-1], timeline)}
+    columns['interval_type'] = pyarrow.DictionaryArray.from_arrays(
+        pyarrow.array(timeline.interval_type, type=pyarrow.int8()),
+        _TYPE_NAMES)
+    return pyarrow.table(columns)
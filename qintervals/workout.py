@@ -1,49 +1,123 @@
 from collections import namedtuple
-from copy import copy
 from enum import Enum, auto
-from .interval import Interval, IntervalType
-from time import time
+from itertools import islice
+from math import ceil
+from .block import Block
+from .clock import MonotonicClock, NS_PER_SECOND, to_seconds
+from .interval import (Interval, IntervalType, IntervalTypeError,
+                       TimeUnitError)
+from .plan import Plan
+from time import perf_counter
 import yaml
 
+# Use the libyaml parser when PyYAML has been built with it
+try:
+    _YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
 # Container for interval starting and ending times
 _Timing = namedtuple('Timing', ['starts_at', 'ends_at'])
-# Container for returning workout progress information
-_Progress = namedtuple('Progress', ['elapsed', 'remaining', 'interval_elapsed',
-                                    'interval_remaining', 'interval',
-                                    'changed_interval'])
+# Container for the time taken to load each stage of a workout, in seconds
+_LoadTimes = namedtuple('LoadTimes', ['parse', 'unpack', 'index'])
+# Container for an interval and its position in the workout
+_Position = namedtuple('Position', ['interval', 'index', 'starts_at',
+                                    'ends_at'])
+# Container for an interval or block repeated a number of times, the position
+# of its first interval and the number of intervals it covers
+_Run = namedtuple('Run', ['entry', 'repeats', 'index', 'count'])
+
+
+# Timing of a workout following a plan
+#
+# The plan holds the title and intervals of the workout and the workout holds
+# only the state of one run through it, so a frozen plan may be followed by
+# any number of workouts at once. Adding intervals to a workout whose plan is
+# frozen first gives the workout its own copy of the plan.
+class Workout(object):
+    __slots__ = ('clock', 'plan', 'state', 'start_time', 'time_paused',
+                 'paused_at', 'load_times', '_last_position',
+                 '_next_position', '_progress')
 
+    def __init__(self, yaml_file=None, clock=None, plan=None):
+        # Source of the current time, start, pause and paused times are
+        # integer nanoseconds read from this clock
+        if clock is None:
+            clock = MonotonicClock()
+        self.clock = clock
+
+        if plan is None:
+            plan = Plan()
+        self.plan = plan
 
-# A collection of intervals and methods for timing a workout
-class Workout(object):
-    def __init__(self, yaml_file=None):
-        self.intervals = []
-        self.timings = {}
-        self.total_time = 0
-        self.time_paused = 0
         self.state = WorkoutState.stopped
+        self.start_time = 0
+        self.time_paused = 0
+        self.paused_at = 0
+
+        # Time taken to load the workout from a yaml file
+        self.load_times = None
+
+        # Last known position, used for determining when the current interval
+        # has changed, and the position following it
+        self._last_position = None
+        self._next_position = None
 
-        # Marker for last known interval, used for determining when the
-        # current interval has changed
-        self._last_interval = None
+        # Progress record reused by every call to progress
+        self._progress = _Progress()
 
         if yaml_file:
             self.from_yaml(yaml_file)
-            # Initialise last interval
-            self._last_interval = self.intervals[0]
+        # Initialise last interval, for workouts given a plan
+        self._init_position()
+
+    # Title of the workout
+    @property
+    def name(self):
+        return self.plan.name
+
+    # Top level intervals and blocks of the workout
+    @property
+    def schedule(self):
+        return self.plan.schedule
+
+    @property
+    def intervals(self):
+        return self.plan.intervals
+
+    @property
+    def total_time(self):
+        return self.plan.total_time
+
+    # The plan, copied first if it is frozen, so that it may be changed
+    def _editable_plan(self):
+        if self.plan.frozen:
+            self.plan = self.plan.copy()
+        return self.plan
 
     # Parse a yaml file to read a workout
+    # The workout may be given as a path, an open stream or a dictionary which
+    # has already been parsed
     def from_yaml(self, yaml_file):
+        begin = perf_counter()
+
         # Parse yaml file as a dictionary
-        with open(yaml_file, 'rb') as stream:
-            try:
-                yaml_dict = yaml.load(stream, Loader=yaml.SafeLoader)
-            except yaml.YAMLError:
-                raise WorkoutFileError(
-                    'Invalid YAML in workout file: {}'.format(yaml_file))
+        if isinstance(yaml_file, dict):
+            yaml_dict = yaml_file
+        elif hasattr(yaml_file, 'read'):
+            yaml_dict = self._parse(yaml_file,
+                                    getattr(yaml_file, 'name', '<stream>'))
+        else:
+            with open(yaml_file, 'rb') as stream:
+                yaml_dict = self._parse(stream, yaml_file)
+        if not isinstance(yaml_dict, dict):
+            raise WorkoutFileError('Workout file is not a mapping')
+
+        parsed = perf_counter()
 
         # Read workout title
         try:
-            self.name = yaml_dict['title']
+            self._editable_plan().name = yaml_dict['title']
         except KeyError:
             raise MissingKeyError('Workout file missing key: "title"')
 
@@ -52,25 +126,113 @@ class Workout(object):
             entries = yaml_dict['intervals']
         except KeyError:
             raise MissingKeyError('Workout file missing key: "intervals"')
+        if not isinstance(entries, list):
+            raise MalformedWorkoutError(
+                'Workout file "intervals" is not a list')
 
         # Unpack blocks or intervals and add them to the workout
+        entries = [self._unpack(entry) for entry in entries]
+        unpacked = perf_counter()
+
         for entry in entries:
-            for interval in self._unpack(entry):
-                self.add_interval(interval)
+            if isinstance(entry, Block):
+                self.add_block(entry)
+            else:
+                self.add_interval(entry)
+        indexed = perf_counter()
+        self.plan.freeze()
+
+        self.load_times = _LoadTimes(parse=parsed-begin,
+                                     unpack=unpacked-parsed,
+                                     index=indexed-unpacked)
+
+    # Parse a yaml stream as a dictionary
+    def _parse(self, stream, name):
+        try:
+            return yaml.load(stream, Loader=_YamlLoader)
+        except yaml.YAMLError:
+            raise WorkoutFileError(
+                'Invalid YAML in workout file: {}'.format(name))
+
+    # Read a workout from a yaml file incrementally
+    # Each interval or block is added to the workout as soon as it has been
+    # parsed, without reading the whole file into memory first. This is a
+    # generator which yields each entry after adding it, so the workout may be
+    # used while the rest of the file is read.
+    def iter_yaml(self, yaml_file):
+        with open(yaml_file, 'rb') as stream:
+            # Only the pure Python loader exposes the composer
+            loader = yaml.SafeLoader(stream)
+            try:
+                yield from self._iter_events(loader)
+            except yaml.YAMLError:
+                raise WorkoutFileError(
+                    'Invalid YAML in workout file: {}'.format(yaml_file))
+            finally:
+                loader.dispose()
+
+    def _iter_events(self, loader):
+        # Parse a single yaml node
+        def construct():
+            node = loader.compose_node(None, None)
+            value = loader.construct_object(node, deep=True)
+            # Forget constructed objects so memory use does not grow
+            loader.constructed_objects = {}
+            return value
+
+        # Skip the start of the stream and document
+        loader.get_event()
+        if loader.check_event(yaml.DocumentStartEvent):
+            loader.get_event()
+        if not loader.check_event(yaml.MappingStartEvent):
+            raise WorkoutFileError('Workout file is not a mapping')
+        loader.get_event()
+
+        found_title = False
+        found_intervals = False
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = construct()
+            if key == 'intervals' and loader.check_event(
+                    yaml.SequenceStartEvent):
+                found_intervals = True
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    entry = self._unpack(construct())
+                    if isinstance(entry, Block):
+                        self.add_block(entry)
+                    else:
+                        self.add_interval(entry)
+                    yield entry
+                loader.get_event()
+            else:
+                value = construct()
+                if key == 'title':
+                    found_title = True
+                    self._editable_plan().name = value
+
+        if not found_title:
+            raise MissingKeyError('Workout file missing key: "title"')
+        if not found_intervals:
+            raise MissingKeyError('Workout file missing key: "intervals"')
+        self.plan.freeze()
 
-    # Unpack a single interval or block into a list of interval objects
+    # Unpack a single interval or block into an interval or block object
     def _unpack(self, entry):
+        _check(isinstance(entry, dict), 'Entry is not a mapping', entry)
+
         # Determine whether argument is a single interval or a block
-        if 'block' in entry.keys():
-            intervals = []
+        if 'block' in entry:
             block = entry['block']
+            _check(isinstance(block, dict), 'Block is not a mapping', entry)
             try:
                 repeats = block['repeats']
-                assert isinstance(repeats, int)
             except KeyError:
                 raise MissingKeyError(
                     'Block in workout file missing key:' +
                     ' "repeats"\n\t{}'.format(entry))
+            _check(isinstance(repeats, int) and not isinstance(repeats, bool)
+                   and repeats >= 0,
+                   'Block "repeats" is not a whole number', entry)
 
             # Unpack intervals or blocks inside this entry recursively
             try:
@@ -79,60 +241,122 @@ class Workout(object):
                 raise MissingKeyError(
                     'Block in workout file missing key:' +
                     ' "intervals"\n\t{}'.format(entry))
-
-            for sub_entry in sub_entries:
-                intervals += self._unpack(sub_entry)
-
-            # Return the correct number of repetitions
-            intervals = [copy(interval) for interval in intervals*repeats]
-            try:
-                if block["skip_last_rest"]:
-                    if intervals[-1].interval_type is IntervalType.rest:
-                        intervals = intervals[:-1]
-            except KeyError:
-                pass
-
-            return intervals
+            _check(isinstance(sub_entries, list),
+                   'Block "intervals" is not a list', entry)
+            skip_last_rest = block.get('skip_last_rest', False)
+            _check(isinstance(skip_last_rest, bool),
+                   'Block "skip_last_rest" is not true or false', entry)
+
+            return Block([self._unpack(sub_entry)
+                          for sub_entry in sub_entries],
+                         repeats, skip_last_rest)
         else:
             # Return single interval
             try:
-                return [
-                    Interval(_interval_type[entry['type']],
-                             entry['name'], entry['length'])
-                    ]
+                interval_type = entry['type']
+                name = entry['name']
+                length = entry['length']
             except KeyError:
                 raise MissingKeyError(
                     'Interval in workout file missing a key' +
                     '\n\t{}'.format(entry))
-
-    # Add an interval to the end of the list and update timings
+            if interval_type not in _interval_type:
+                raise IntervalTypeError(
+                    'Invalid interval type provided {}'.format(interval_type))
+            _check(isinstance(name, str), 'Interval "name" is not text',
+                   entry)
+            _check(isinstance(length, str) and _is_number(length[:-1]),
+                   'Interval "length" is not a number of minutes(m) or'
+                   ' seconds(s)', entry)
+            return Interval(_interval_type[interval_type], name, length)
+
+    # Add an interval to the end of the workout and update timings
     def add_interval(self, interval):
-        self.intervals.append(interval)
-        self.timings[interval] = _Timing(
-            starts_at=self.total_time,
-            ends_at=self.total_time+interval.length)
-        self.total_time += interval.length
+        self._editable_plan().append(interval)
+        self._init_position()
+
+    # Add a block to the end of the workout and update timings
+    def add_block(self, block):
+        self._editable_plan().append(block)
+        self._init_position()
+
+    # Start at the first interval once there is one
+    def _init_position(self):
+        if self._last_position is None and len(self.intervals) > 0:
+            self._set_last_position(self._position(0))
+
+    # Starting and ending times of an interval
+    def timing(self, index):
+        position = self._position(index)
+        return _Timing(starts_at=position.starts_at, ends_at=position.ends_at)
 
     # Start the workout timer
     def start(self):
         if self.state == WorkoutState.paused:
             self.state = WorkoutState.running
-            self.time_paused += time() - self.paused_at
+            self.time_paused += self.clock.now() - self.paused_at
         elif self.state == WorkoutState.stopped:
             self.state = WorkoutState.running
-            self.start_time = time()
-            self._last_interval = self.intervals[0]
+            self.start_time = self.clock.now()
+            self._set_last_position(self._position(0))
 
     # Pause the workout timer
     def pause(self):
         self.state = WorkoutState.paused
-        self.paused_at = time()
+        self.paused_at = self.clock.now()
 
     # Stop the timer, return to the beginning
     def stop(self):
         self.state = WorkoutState.stopped
         self.time_paused = 0
-        self._last_interval = self.intervals[0]
+        self._set_last_position(self._position(0))
+
+    # Move to a time in the workout, in seconds, keeping the current state
+    # A stopped workout is paused at the new time. Moving to the end finishes
+    # the workout when its progress is next checked.
+    def seek(self, seconds):
+        seconds = min(max(seconds, 0), self.total_time)
+        if self.state == WorkoutState.stopped:
+            self.state = WorkoutState.paused
+            self.time_paused = 0
+            self.paused_at = self.clock.now()
+        if self.state == WorkoutState.paused:
+            now = self.paused_at
+        else:
+            now = self.clock.now()
+
+        # Round up to whole nanoseconds so that seeking to the start of an
+        # interval never lands at the end of the one before it
+        elapsed = ceil(seconds*NS_PER_SECOND)
+        while to_seconds(elapsed) < seconds:
+            elapsed += 1
+
+        # Only the starting time is moved so time_paused remains the time
+        # spent paused
+        self.start_time = now - self.time_paused - elapsed
+
+        if seconds < self.total_time:
+            self._set_last_position(self._locate(to_seconds(elapsed)))
+
+    # Move to the start of the interval n intervals after the current one, or
+    # before if n is negative. Skipping zero intervals restarts the current
+    # interval and skipping past the last interval finishes the workout.
+    def skip_interval(self, n=1):
+        position = self.current_position()
+        if position is None:
+            return
+        index = max(position.index + n, 0)
+        if index >= len(self.intervals):
+            self.seek(self.total_time)
+        else:
+            self.seek(self._position(index).starts_at)
+
+    # Move to the start of the i-th top level block
+    def jump_to_block(self, i):
+        if not 0 <= i < self.schedule.block_count:
+            raise IndexError('Block index out of range')
+        _, starts_at = self.schedule.block_start(i)
+        self.seek(starts_at)
 
     # Start the workout time if paused, pause the workout timer if not paused
     def start_pause(self):
@@ -141,66 +365,167 @@ class Workout(object):
         else:
             self.pause()
 
-    # Determine the elapsed workout time (not including time paused)
+    # Determine the elapsed workout time in seconds (not including time
+    # paused)
     def elapsed(self):
         if self.state == WorkoutState.paused:
-            return self.paused_at - self.start_time - self.time_paused
+            return to_seconds(
+                self.paused_at - self.start_time - self.time_paused)
         elif self.state == WorkoutState.stopped:
             return 0.0
         else:
-            return time() - self.start_time - self.time_paused
+            return to_seconds(
+                self.clock.now() - self.start_time - self.time_paused)
 
     # Determine the current interval
     def current_interval(self):
+        position = self.current_position()
+        if position is not None:
+            return position.interval
+
+    # Determine the current interval, its index and its starting and ending
+    # times
+    def current_position(self):
         # If the workout is stopped return the first interval
         if self.state == WorkoutState.stopped:
-            return self.intervals[0]
+            return self._position(0)
 
         # Otherwise determine the current interval
         elapsed = self.elapsed()
-        for interval in self.intervals:
-            starts_at = self.timings[interval].starts_at
-            ends_at = self.timings[interval].ends_at
-            if elapsed >= starts_at:
-                if elapsed < ends_at:
-                    return interval
+        if elapsed < self.total_time:
+            return self._locate(elapsed)
+
+    # Time read from the workout clock at which the current interval ends, or
+    # None if the workout is not running
+    def boundary(self):
+        if self.state != WorkoutState.running:
+            return None
+
+        position = self.current_position()
+        if position is None:
+            # Already finished
+            return self.clock.now()
+        return (self.start_time + self.time_paused
+                + ceil(position.ends_at*NS_PER_SECOND))
+
+    # The interval at a position in the workout and its timings
+    def _position(self, index):
+        interval, starts_at = self.schedule.interval_at(index)
+        return _Position(interval, index, starts_at,
+                         starts_at+interval.length)
+
+    # Find the position of the interval containing a time
+    def _locate(self, elapsed):
+        # Time only moves forward so check the last known interval and its
+        # successor before descending the schedule
+        for position in (self._last_position, self._next_position):
+            if position is not None:
+                if position.starts_at <= elapsed < position.ends_at:
+                    return position
+
+        interval, index, starts_at = self.schedule.locate(elapsed)
+        return _Position(interval, index, starts_at,
+                         starts_at+interval.length)
+
+    # Record the last known position and look ahead to the next one
+    def _set_last_position(self, position):
+        self._last_position = position
+        if position.index+1 < len(self.intervals):
+            self._next_position = self._position(position.index+1)
+        else:
+            self._next_position = None
 
     # Return a summary of the progress of the workout
     # Returned values are the total time elapsed and remaining,
     # current interval time elapsed and remaining, the current interval
     # and whether the interval has changed since the last call
+    #
+    # This is called on every frame so the same progress record is updated in
+    # place and returned each time, and the schedule is only searched when the
+    # elapsed time leaves the last known interval
     def progress(self):
         elapsed = self.elapsed()
+        progress = self._progress
+        total_time = self.plan.total_time
+
         # Check for the end of the workout
-        if elapsed >= self.total_time:
+        if elapsed >= total_time:
             self.stop()
-            return _Progress(
-                elapsed=0, remaining=self.total_time,
-                interval_elapsed=0,
-                interval_remaining=self.intervals[0].length,
-                interval=self.intervals[0], changed_interval=True)
+            first = self._last_position
+            progress.update(0, total_time, 0, first.interval.length,
+                            first.interval, True)
+            return progress
+
+        position = self._last_position
+        changed_interval = False
+        if not position.starts_at <= elapsed < position.ends_at:
+            position = self._locate(elapsed)
+            changed_interval = position.index != self._last_position.index
+            if changed_interval:
+                self._set_last_position(position)
+
+        interval_elapsed = elapsed - position.starts_at
+        progress.update(elapsed, total_time - elapsed, interval_elapsed,
+                        position.interval.length - interval_elapsed,
+                        position.interval, changed_interval)
+        return progress
+
+    # Iterate over the intervals following the current interval
+    def iter_upcoming(self):
+        return self.schedule.iter_intervals(self._upcoming_index())
+
+    # Iterate over the intervals following the current interval as runs of
+    # repeated blocks and intervals, see Block.iter_runs. Consecutive equal
+    # intervals are merged into a single run.
+    def iter_upcoming_runs(self):
+        index = self._upcoming_index()
+        run = None
+        for entry, repeats, count in self.schedule.iter_runs(index):
+            if run is not None and _same_interval(run.entry, entry):
+                run = run._replace(repeats=run.repeats+repeats,
+                                   count=run.count+count)
+            else:
+                if run is not None:
+                    yield run
+                run = _Run(entry, repeats, index, count)
+            index += count
+        if run is not None:
+            yield run
+
+    def _upcoming_index(self):
+        if self.state == WorkoutState.stopped:
+            return 1
+        return self._locate(self.elapsed()).index + 1
 
-        remaining = self.total_time - elapsed
+    # List upcoming intervals, up to an optional limit
+    def upcoming(self, limit=None):
+        return list(islice(self.iter_upcoming(), limit))
 
-        interval = self.current_interval()
+    # Progress of the whole workout sampled every resolution seconds from its
+    # start, computed from the schedule without running the workout, see
+    # timeline.timeline
+    def timeline(self, resolution=1.0):
+        # NumPy is slow to import so the timeline module is only loaded here
+        from .timeline import timeline
+        return timeline(self.schedule, resolution)
 
-        changed_interval = interval is not self._last_interval
-        if changed_interval:
-            self._last_interval = interval
 
-        interval_elapsed = elapsed - self.timings[interval].starts_at
-        interval_remaining = interval.length - interval_elapsed
+# Workout progress information
+class _Progress(object):
+    __slots__ = ('elapsed', 'remaining', 'interval_elapsed',
+                 'interval_remaining', 'interval', 'changed_interval')
 
-        return _Progress(
-            elapsed=elapsed, remaining=remaining,
-            interval_elapsed=interval_elapsed,
-            interval_remaining=interval_remaining,
-            interval=interval, changed_interval=changed_interval)
+    def __init__(self):
+        self.update(0, 0, 0, 0, None, False)
 
-    # List upcoming intervals
-    def upcoming(self):
-        index = self.intervals.index(self.current_interval())
-        return self.intervals[index+1:]
+    def update(self, elapsed, remaining, interval_elapsed, interval_remaining,
+               interval, changed_interval):
+        self.elapsed = elapsed
+        self.remaining = remaining
+        self.interval_elapsed = interval_elapsed
+        self.interval_remaining = interval_remaining
+        self.interval = interval
+        self.changed_interval = changed_interval
 
 
 # Workout states
@@ -220,9 +545,47 @@ class MissingKeyError(Exception):
     pass
 
 
+# Entry of the wrong type in YAML file error
+class MalformedWorkoutError(WorkoutFileError):
+    pass
+
+
+# Raise a MalformedWorkoutError describing an entry unless condition is true
+def _check(condition, message, entry):
+    if not condition:
+        raise MalformedWorkoutError(
+            '{} in workout file\n\t{}'.format(message, entry))
+
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+# Whether two entries are intervals of the same type, name and length
+def _same_interval(a, b):
+    return (isinstance(a, Interval) and isinstance(b, Interval)
+            and a.interval_type is b.interval_type and a.text == b.text
+            and a.length == b.length)
+
+
 # Interval type translation dictionary
 _interval_type = {
     'work': IntervalType.work,
     'rest': IntervalType.rest,
     'warmup': IntervalType.warmup,
     'warmdown': IntervalType.warmdown}
+
+
+# Errors raised when reading an invalid workout file
+WORKOUT_ERRORS = (OSError, WorkoutFileError, MissingKeyError, TimeUnitError,
+                  IntervalTypeError)
+
+
+# Description of an error raised reading a workout file, used wherever errors
+# are reported
+def describe_error(error):
+    return str(error) or type(error).__name__
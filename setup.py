@@ -12,6 +12,10 @@ setup(
     license='GPLv3',
     packages=find_packages(),
     install_requires=['pyyaml', 'PyQt5'],
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow']
+    },
     include_package_data=True,
     entry_points={
         "console_scripts": ["qintervals = qintervals.__main__:main"]
@@ -1,7 +1,13 @@
 from os import path
+from qintervals.clock import VirtualClock
 import pytest
 
 
 @pytest.fixture()
 def test_data():
     return path.abspath(path.join(path.dirname(__file__), 'data'))
+
+
+@pytest.fixture()
+def clock():
+    return VirtualClock()
@@ -0,0 +1,47 @@
+from io import StringIO
+import json
+import os
+from qintervals.batch import summarise, find_workouts, run
+
+
+def test_summarise(test_data):
+    summary = summarise(test_data+'/nested_blocks.yml')
+
+    assert summary['valid']
+    assert summary['title'] == 'Block Test'
+    assert summary['total_time'] == 36
+    assert summary['intervals'] == 12
+    assert summary['types'] == {'work': 11, 'rest': 0, 'warmup': 1,
+                                'warmdown': 0}
+
+
+def test_summarise_invalid(test_data):
+    summary = summarise(test_data+'/missing_title.yml')
+
+    assert not summary['valid']
+    assert summary['error'] == 'MissingKeyError'
+
+
+def test_summarise_compile(test_data, tmp_path):
+    summary = summarise(test_data+'/basic.yml', compile=True,
+                        directory=str(tmp_path))
+
+    assert summary['valid']
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
+def test_find_workouts(test_data):
+    files = list(find_workouts([test_data]))
+
+    assert len(files) == 10
+    assert files == sorted(files)
+
+
+def test_run(test_data):
+    stream = StringIO()
+    invalid = run([test_data], jobs=2, stream=stream)
+    results = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert invalid == 6
+    assert [result['file'] for result in results] == list(
+        find_workouts([test_data]))
@@ -0,0 +1,113 @@
+from qintervals.block import Block
+from qintervals.interval import Interval, IntervalType
+
+
+def make_block():
+    work = Interval(IntervalType.work, 'Work', '15s')
+    rest = Interval(IntervalType.rest, 'Rest', '45s')
+    return Block([work, rest], 3, skip_last_rest=True)
+
+
+def test_totals():
+    block = make_block()
+
+    assert block.count == 5
+    assert block.length == 3*60 - 45
+
+
+def test_skip_last_rest_not_rest():
+    work = Interval(IntervalType.work, 'Work', '15s')
+    block = Block([work], 2, skip_last_rest=True)
+
+    assert block.skip_last_rest is False
+    assert block.count == 2
+
+
+def test_interval_at():
+    block = make_block()
+
+    interval, starts_at = block.interval_at(3)
+    assert interval.text == 'Rest'
+    assert starts_at == 75
+
+
+def test_locate():
+    block = make_block()
+
+    interval, index, starts_at = block.locate(130)
+    assert interval.text == 'Work'
+    assert index == 4
+    assert starts_at == 120
+
+
+def test_iter_intervals():
+    block = make_block()
+    names = [interval.text for interval in block.iter_intervals(2)]
+
+    assert names == ['Work', 'Rest', 'Work']
+
+
+def test_nested_not_expanded():
+    interval = Interval(IntervalType.work, 'Tick', '1s')
+    block = Block([Block([Block([interval], 100)], 100)], 100)
+
+    assert block.count == 1000000
+    assert block.length == 1000000
+
+    located, index, starts_at = block.locate(654321.5)
+    assert located is interval
+    assert index == 654321
+    assert starts_at == 654321
+
+
+def test_type_counts():
+    block = Block([make_block(), make_block()], 2)
+    counts = block.type_counts()
+
+    assert counts[IntervalType.work] == 12
+    assert counts[IntervalType.rest] == 8
+    assert sum(counts.values()) == block.count
+
+
+def test_block_start():
+    interval = Interval(IntervalType.work, 'Work', '10s')
+    block = Block([interval, make_block(), interval, make_block()])
+
+    assert block.block_count == 2
+    assert block.block_start(0) == (1, 10)
+    assert block.block_start(1) == (7, 10 + 135 + 10)
+
+
+def test_iter_runs():
+    block = make_block()
+    work, rest = block.entries
+
+    assert list(block.iter_runs()) == [(block, 3, 5)]
+    assert list(block.iter_runs(1)) == [(rest, 1, 1), (block, 2, 3)]
+    assert list(block.iter_runs(3)) == [(rest, 1, 1), (work, 1, 1)]
+    assert list(block.iter_runs(5)) == []
+
+
+def test_iter_runs_nested():
+    interval = Interval(IntervalType.work, 'Tick', '1s')
+    inner = Block([interval], 100)
+    block = Block([inner, interval], 100)
+
+    assert list(block.iter_runs()) == [(block, 100, 10100)]
+    assert list(block.iter_runs(150)) == [(inner, 51, 51), (interval, 1, 1),
+                                          (block, 98, 9898)]
+    runs = list(block.iter_runs(10099))
+    assert runs == [(interval, 1, 1)]
+
+
+def test_iter_runs_empty():
+    work = Interval(IntervalType.work, 'Work', '15s')
+    rest = Interval(IntervalType.rest, 'Rest', '45s')
+    empty = Block([], 2)
+    skipped = Block([Block([rest], skip_last_rest=True)], 3)
+    block = Block([work, empty, skipped, work])
+
+    assert list(empty.iter_runs()) == []
+    assert list(skipped.iter_runs()) == []
+    assert list(block.iter_runs()) == [(work, 1, 1), (work, 1, 1)]
+    assert list(block.iter_runs(1)) == [(work, 1, 1)]
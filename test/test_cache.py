@@ -0,0 +1,91 @@
+import gc
+import os
+from qintervals import cache
+from qintervals.cache import (load, read_compiled, write_compiled, evict,
+                              CompiledWorkoutError)
+from qintervals.workout import Workout
+import pytest
+
+
+def describe(workout):
+    return [(interval.interval_type, interval.text, interval.length)
+            for interval in workout.intervals]
+
+
+def test_round_trip(test_data, tmp_path):
+    workout = Workout(yaml_file=test_data+'/nested_blocks.yml')
+    compiled_file = str(tmp_path / 'nested.qint')
+    write_compiled(workout.plan, compiled_file)
+    compiled = read_compiled(compiled_file)
+
+    assert compiled.name == workout.name
+    assert compiled.total_time == workout.total_time
+    assert describe(compiled) == describe(workout)
+
+
+def test_load_uses_cache(test_data, tmp_path, monkeypatch):
+    workout = load(test_data+'/block.yml', directory=str(tmp_path))
+    expected = describe(workout)
+    cached = os.listdir(str(tmp_path))
+
+    assert len(cached) == 1
+
+    # Forget the plan loaded by this process so that the compiled file is
+    # read back
+    del workout
+    gc.collect()
+    reads = []
+
+    def spy_read_compiled(compiled_file):
+        reads.append(compiled_file)
+        return read_compiled(compiled_file)
+
+    def from_yaml(*args, **kwargs):
+        raise AssertionError('Workout file parsed again')
+    monkeypatch.setattr(cache, 'read_compiled', spy_read_compiled)
+    monkeypatch.setattr(Workout, 'from_yaml', from_yaml)
+    compiled = load(test_data+'/block.yml', directory=str(tmp_path))
+
+    assert reads == [os.path.join(str(tmp_path), cached[0])]
+    assert os.listdir(str(tmp_path)) == cached
+    assert compiled.load_times is None
+    assert describe(compiled) == expected
+
+
+def test_load_shares_plan(test_data, tmp_path):
+    workout = load(test_data+'/block.yml', directory=str(tmp_path))
+    compiled = load(test_data+'/block.yml', directory=str(tmp_path))
+
+    assert compiled.plan is workout.plan
+
+
+def test_read_only_cache(test_data, tmp_path, monkeypatch):
+    load(test_data+'/basic.yml', directory=str(tmp_path))
+    gc.collect()
+
+    def utime(path):
+        raise PermissionError('Operation not permitted')
+    monkeypatch.setattr(os, 'utime', utime)
+    workout = load(test_data+'/basic.yml', directory=str(tmp_path))
+
+    assert workout.load_times is None
+    assert workout.name == 'Basic Test'
+
+
+def test_invalid_compiled(tmp_path):
+    compiled_file = tmp_path / 'invalid.qint'
+    compiled_file.write_bytes(b'QINT not a workout')
+
+    with pytest.raises(CompiledWorkoutError):
+        read_compiled(str(compiled_file))
+
+
+def test_evict(tmp_path):
+    for i in range(4):
+        path = tmp_path / '{}.qint'.format(i)
+        path.write_bytes(b'x' * 100)
+        os.utime(str(path), (i, i))
+
+    evict(str(tmp_path), max_size=250)
+
+    assert sorted(os.listdir(str(tmp_path))) == ['2.qint', '3.qint']
@@ -0,0 +1,26 @@
+from qintervals.clock import MonotonicClock, VirtualClock, to_ns, to_seconds
+
+
+def test_conversion():
+    assert to_ns(1.5) == 1500000000
+    assert to_seconds(to_ns(0.01)) == 0.01
+
+
+def test_monotonic_clock():
+    clock = MonotonicClock()
+    first = clock.now()
+
+    assert isinstance(first, int)
+    assert clock.now() >= first
+
+
+def test_virtual_clock():
+    clock = VirtualClock()
+    clock.advance(0.25)
+    clock.advance(0.25)
+
+    assert clock.now() == to_ns(0.5)
+
+    clock.set(10)
+
+    assert clock.now() == to_ns(10)
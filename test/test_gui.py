@@ -0,0 +1,79 @@
+import os
+import pytest
+
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+# Render widgets without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='module')
+def qapp():
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication(['qintervals'])
+    return app
+
+
+def test_slow_arc_repainted(qapp):
+    from qintervals.gui import CountDown
+    count_down = CountDown(None)
+    count_down.resize(300, 300)
+    updates = []
+    count_down.update = updates.append
+
+    # The total time arc of an hour long workout moves much less than a
+    # pixel each frame, the interval arc does not move
+    total = 3600
+    for i in range(1000):
+        elapsed = i / 10
+        count_down.update_times(elapsed, total-elapsed, 5, 5)
+
+    # 100 s moves the outer arc about 26 pixels
+    assert len(updates) >= 20
+
+
+def test_telemetry_shown_before_start(qapp, test_data):
+    from PyQt5 import QtTest
+    from qintervals.gui import Ui
+    from qintervals.telemetry import CHANNELS, Telemetry
+    from qintervals.workout import Workout
+    workout = Workout(test_data+'/basic.yml')
+    telemetry = Telemetry(workout)
+    ui = Ui(workout, telemetry=telemetry)
+
+    telemetry.record(CHANNELS.index('power'), 250)
+    QtTest.QTest.qWait(400)
+
+    assert 'Power 250 W' in ui.telemetry_panel.text()
+    ui.close()
+
+
+def test_tones_cached(tmp_path, monkeypatch):
+    from qintervals import audio
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    sounds, directory = audio.sound_files()
+    assert directory is None
+    assert os.path.dirname(sounds['countdown']) == audio.tone_dir()
+
+    # Tones are only rendered the first time
+    def render_tone(*args):
+        raise AssertionError('Tone rendered again')
+    monkeypatch.setattr(audio, 'render_tone', render_tone)
+    assert audio.sound_files()[0] == sounds
+
+
+def test_first_frame(qapp, test_data):
+    from PyQt5 import QtTest
+    from qintervals.gui import Ui
+    from qintervals.workout import Workout
+    ui = Ui(Workout(test_data+'/basic.yml'))
+    frames = []
+    ui.first_frame.connect(lambda: frames.append(True))
+
+    QtTest.QTest.qWait(100)
+    ui.update()
+    QtTest.QTest.qWait(100)
+
+    assert frames == [True]
+    ui.close()
@@ -26,3 +26,10 @@ def test_time_unit_conversion():
     interval = Interval(IntervalType.work, 'test', '1m')
     interval2 = Interval(IntervalType.work, 'test', '60s')
     assert interval.length == interval2.length == 60
+
+
+def test_shared_text():
+    interval = Interval(IntervalType.work, ''.join(['Zone', ' 4']), '1m')
+    interval2 = Interval(IntervalType.rest, ''.join(['Zone 4', '']), '1m')
+    assert interval.text is interval2.text
+    assert not hasattr(interval, '__dict__')
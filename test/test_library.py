@@ -0,0 +1,92 @@
+import os
+import pytest
+import shutil
+from qintervals.library import Library
+
+
+@pytest.fixture()
+def workouts(test_data, tmp_path):
+    directory = tmp_path / 'workouts'
+    shutil.copytree(test_data, str(directory))
+    return str(directory)
+
+
+@pytest.fixture()
+def library(tmp_path):
+    with Library(str(tmp_path / 'library.sqlite')) as library:
+        yield library
+
+
+def test_scan(library, workouts):
+    result = library.scan([workouts])
+
+    assert result.parsed == 10
+    assert result.invalid == 6
+    assert len(library.search()) == 4
+    assert len(library.invalid()) == 6
+    assert library.roots() == [workouts]
+
+
+def test_entry(library, workouts):
+    library.scan([workouts])
+    entry, = library.search('block test', min_time=30)
+
+    assert entry.path == os.path.join(workouts, 'nested_blocks.yml')
+    assert entry.total_time == 36
+    assert entry.intervals == 12
+    assert entry.blocks == 2
+    assert entry.types == {'work': 11, 'rest': 0, 'warmup': 1,
+                           'warmdown': 0}
+    assert library.get(entry.id) == entry
+
+
+def test_search(library, workouts):
+    library.scan([workouts])
+
+    assert [entry.title for entry in library.search(max_time=12)] == [
+        'Quick', 'Basic Test']
+    assert [entry.title for entry in library.search(
+        interval_type='rest')] == ['Basic Test']
+    assert len(library.search(limit=1)) == 1
+    assert library.search('%') == []
+
+
+def test_rescan_unchanged(library, workouts):
+    library.scan([workouts])
+    # Reading a file without changing it is not enough to parse it again
+    os.utime(os.path.join(workouts, 'basic.yml'), ns=(0, 0))
+    result = library.scan()
+
+    assert result.parsed == 0
+    assert result.unchanged == 10
+
+
+def test_rescan_changed(library, workouts):
+    library.scan([workouts])
+    with open(os.path.join(workouts, 'basic.yml'), 'a') as stream:
+        stream.write('  - type: rest\n    name: Five\n    length: 3s\n')
+    os.remove(os.path.join(workouts, 'quick.yml'))
+    result = library.scan()
+
+    assert result.parsed == 1
+    assert result.removed == 1
+    entry, = library.search('basic')
+    assert entry.intervals == 5
+
+
+def test_scan_pool(library, workouts):
+    for i in range(20):
+        shutil.copy(os.path.join(workouts, 'basic.yml'),
+                    os.path.join(workouts, 'copy{}.yml'.format(i)))
+    result = library.scan([workouts], jobs=2)
+
+    assert result.parsed == 30
+    assert len(library.search('basic')) == 21
+
+
+def test_persisted(tmp_path, workouts):
+    path = str(tmp_path / 'library.sqlite')
+    with Library(path) as library:
+        library.scan([workouts])
+    with Library(path) as library:
+        assert len(library.search()) == 4
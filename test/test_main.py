@@ -0,0 +1,45 @@
+import pytest
+import subprocess
+import sys
+from qintervals.__main__ import batch_main, parse_args, ui_main
+
+
+def test_default_command():
+    clargs, qt_args = parse_args(['--stats', 'workout.yml', '-style',
+                                  'fusion'])
+
+    assert clargs.main is ui_main
+    assert clargs.workout == 'workout.yml'
+    assert clargs.stats
+    assert qt_args == ['-style', 'fusion']
+
+
+def test_command():
+    clargs, qt_args = parse_args(['validate', '-j', '2', 'workouts'])
+
+    assert clargs.main is batch_main
+    assert clargs.paths == ['workouts']
+    assert clargs.jobs == 2
+
+
+@pytest.mark.parametrize('argv', [
+    ['--unknown', 'workout.yml'],
+    ['validate', '-style', 'workouts'],
+    ['timeline', '--resolution', '0', 'workout.yml', '-'],
+    ['sensors']
+])
+def test_invalid_arguments(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+
+def test_closed_output(test_data):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'qintervals', 'timeline', '-r', '0.001',
+         test_data+'/nested_blocks.yml', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.stdout.readline()
+    process.stdout.close()
+
+    assert process.wait() == 1
+    assert process.stderr.read() == b''
@@ -0,0 +1,59 @@
+from qintervals.block import Block
+from qintervals.interval import Interval, IntervalType
+from qintervals.plan import Plan, intern_plan
+import gc
+import pytest
+import weakref
+
+
+def make_plan(name='Plan'):
+    work = Interval(IntervalType.work, 'Work', '15s')
+    rest = Interval(IntervalType.rest, 'Rest', '45s')
+    return Plan(name, [work, Block([work, rest], 3)])
+
+
+def test_totals():
+    plan = make_plan()
+
+    assert plan.total_time == 15 + 3*60
+    assert len(plan.intervals) == 7
+
+
+def test_frozen():
+    plan = make_plan().freeze()
+
+    with pytest.raises(AttributeError):
+        plan.append(Interval(IntervalType.work, 'Work', '15s'))
+    with pytest.raises(AttributeError):
+        plan.name = 'Changed'
+
+    copy = plan.copy()
+    copy.append(Interval(IntervalType.work, 'Work', '15s'))
+    assert len(copy.intervals) == len(plan.intervals) + 1
+
+
+def test_equality():
+    assert make_plan() == make_plan()
+    assert make_plan() != make_plan('Other')
+    assert make_plan().freeze() in {make_plan().freeze()}
+
+
+def test_unfrozen_unhashable():
+    with pytest.raises(TypeError):
+        hash(make_plan())
+
+
+def test_intern():
+    plan = intern_plan(make_plan())
+
+    assert intern_plan(make_plan()) is plan
+    assert intern_plan(make_plan('Other')) is not plan
+
+
+def test_interned_plan_collected():
+    plan = intern_plan(make_plan('Collected'))
+    reference = weakref.ref(plan)
+    del plan
+    gc.collect()
+
+    assert reference() is None
@@ -0,0 +1,102 @@
+import asyncio
+from io import StringIO
+import json
+from qintervals.clock import VirtualClock
+from qintervals.server import Client, SessionManager, run_class, start_server
+
+
+# Stream which records the lines written to it
+class Writer(object):
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+    def is_closing(self):
+        return False
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_shared_schedule(test_data, tmp_path):
+    manager = SessionManager(cache_dir=str(tmp_path))
+    first = manager.open(test_data+'/basic.yml')
+    second = manager.open(test_data+'/basic.yml')
+
+    assert first != second
+    assert (manager.sessions[first].workout.schedule
+            is manager.sessions[second].workout.schedule)
+
+
+def test_boundaries(test_data, tmp_path):
+    async def session():
+        clock = VirtualClock()
+        manager = SessionManager(clock=clock, cache_dir=str(tmp_path))
+        writer = Writer()
+        session_id = manager.open(test_data+'/block.yml')
+        manager.watch(session_id, writer)
+        manager.start(session_id)
+
+        # Nothing happens before the first boundary
+        clock.set(2.9)
+        manager.expire()
+        assert writer.lines == []
+
+        clock.set(3.5)
+        manager.expire()
+        assert writer.lines == [{'event': 'interval', 'session': session_id,
+                                 'index': 1, 'interval': 'Two',
+                                 'type': 'work', 'length': 3.0}]
+        assert manager.progress(session_id)['interval_elapsed'] == 0.5
+
+        # No boundaries are queued while paused
+        manager.pause(session_id)
+        clock.set(100)
+        manager.expire()
+        assert len(writer.lines) == 1
+
+        manager.start(session_id)
+        clock.set(200)
+        manager.expire()
+        assert writer.lines[-1] == {'event': 'finished',
+                                    'session': session_id}
+        assert manager._boundaries == []
+
+    run(session())
+
+
+def test_handle_errors(tmp_path):
+    manager = SessionManager(cache_dir=str(tmp_path))
+
+    assert manager.handle({'command': 'start', 'session': 1}) == {
+        'ok': False, 'error': 'No such session: 1'}
+    assert not manager.handle({'command': 'open'})['ok']
+    assert not manager.handle({'command': 'open',
+                               'workout': str(tmp_path/'missing.yml')})['ok']
+    assert not manager.handle({'command': 'jump'})['ok']
+
+
+def test_class(test_data, tmp_path):
+    async def session():
+        path = str(tmp_path/'server.sock')
+        server = await start_server(
+            SessionManager(cache_dir=str(tmp_path)), path)
+        async with server:
+            client = await Client.connect(path)
+            stream = StringIO()
+            await asyncio.wait_for(
+                run_class(client, test_data+'/quick.yml', 3, stream), 5)
+            sessions = await client.request('sessions')
+            await client.close()
+        return sessions, [json.loads(line)
+                          for line in stream.getvalue().splitlines()]
+
+    sessions, events = run(session())
+
+    assert sessions['sessions'] == []
+    assert len(events) == 3*3
+    assert sorted(event['session'] for event in events
+                  if event['event'] == 'finished') == [1, 2, 3]
@@ -0,0 +1,48 @@
+import pytest
+from qintervals.simulation import simulate
+from qintervals.workout import Workout, WorkoutState
+
+
+def test_transitions(test_data):
+    workout = Workout(yaml_file=test_data+'/block.yml')
+    simulation = simulate(workout)
+
+    assert [transition.index for transition in simulation.transitions] == [
+        0, 1, 2, 3, 4, 5]
+    assert [transition.time for transition in simulation.transitions] == [
+        pytest.approx(3*i) for i in range(6)]
+    assert [transition.interval for transition in simulation.transitions] \
+        == list(workout.intervals)
+    assert simulation.samples == []
+
+
+def test_timeline(test_data):
+    workout = Workout(yaml_file=test_data+'/nested_blocks.yml')
+    simulation = simulate(workout)
+
+    assert len(simulation.timeline) == len(workout.intervals)
+    assert simulation.timeline[-1].ends_at == workout.total_time
+    for position in simulation.timeline:
+        assert position.interval is workout.intervals[position.index]
+
+
+def test_samples(test_data):
+    workout = Workout(yaml_file=test_data+'/basic.yml')
+    simulation = simulate(workout, sample_rate=2)
+
+    assert len(simulation.samples) == 2*workout.total_time
+    sample = simulation.samples[7]
+    assert sample.elapsed == pytest.approx(3.5)
+    assert sample.remaining == pytest.approx(workout.total_time - 3.5)
+    assert sample.interval_elapsed == pytest.approx(0.5)
+    assert sample.interval_remaining == pytest.approx(2.5)
+    assert sample.index == 1
+
+
+def test_workout_restored(test_data):
+    workout = Workout(yaml_file=test_data+'/basic.yml')
+    clock = workout.clock
+    simulate(workout)
+
+    assert workout.clock is clock
+    assert workout.state == WorkoutState.stopped
@@ -0,0 +1,51 @@
+from io import StringIO
+from qintervals.stats import FrameStats
+
+
+def test_record():
+    stats = FrameStats(['one', 'two'], size=4)
+    for duration in range(1, 11):
+        stats.begin_frame()
+        stats.record(0, duration*1000)
+
+    (name, count, (p50, p99)), two, lateness = stats.summary()
+
+    assert name == 'one'
+    # Only the last four durations are kept
+    assert count == 10
+    assert p50 == 9
+    assert p99 == 10
+    assert two[1] == 0
+    assert lateness[1] == 10
+
+
+def test_mark():
+    stats = FrameStats(['one'])
+    stats.begin_frame()
+    stats.mark(0)
+
+    (_, count, (p50, p99)), _ = stats.summary()
+    assert count == 1
+    assert p50 >= 0
+
+
+def test_report():
+    stats = FrameStats(['one'])
+    stream = StringIO()
+    stats.report(stream)
+
+    assert stream.getvalue().splitlines()[1].startswith('one')
+
+
+def test_untimed_frames():
+    stats = FrameStats(['one'])
+    stats.expect(10**9)
+    # A frame drawn early by the user uses up the expected time without
+    # recording lateness
+    stats.begin_frame(timed=False)
+    stats.begin_frame()
+
+    _, (_, count, (p50, _)) = stats.summary()
+    assert stats.frames == 2
+    assert count == 1
+    assert p50 == 0
@@ -0,0 +1,112 @@
+import pytest
+import socket
+import time
+from io import StringIO
+from qintervals.telemetry import (CHANNELS, Receiver, Ring, Telemetry,
+                                  encode, parse)
+from qintervals.workout import Workout
+
+HEART_RATE = CHANNELS.index('heart_rate')
+POWER = CHANNELS.index('power')
+
+
+def test_ring_wraps():
+    ring = Ring(size=4)
+    for i in range(10):
+        ring.append(i, float(i))
+
+    assert ring.latest() == (9, 9.0)
+    assert ring.samples() == ([6, 7, 8, 9], [6.0, 7.0, 8.0, 9.0])
+
+
+def test_ring_empty():
+    ring = Ring(size=4)
+
+    assert ring.latest() is None
+    assert ring.samples() == ([], [])
+
+
+def test_aggregates(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    telemetry = Telemetry(workout, zones={'power': (200,)})
+    workout.start()
+
+    # One sample a second, half of the first interval below 200 W
+    for value in (100, 300, 300, 150, 150):
+        telemetry.record(POWER, value)
+        clock.advance(1)
+
+    first = telemetry.aggregates(0)[POWER]
+    assert first.count == 3
+    assert first.mean == pytest.approx(700/3)
+    assert first.maximum == 300
+    assert list(first.zone_time) == [10**9, 10**9]
+
+    second = telemetry.aggregates(1)[POWER]
+    assert second.count == 2
+    assert second.mean == 150
+    assert telemetry.aggregates(1)[HEART_RATE].count == 0
+    assert telemetry.aggregates(2) is None
+
+
+def test_not_running(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    telemetry = Telemetry(workout)
+    telemetry.record(POWER, 200)
+
+    assert telemetry.latest(POWER) == 200
+    assert telemetry.summary() == []
+
+
+def test_max_intervals(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    telemetry = Telemetry(workout, max_intervals=2)
+    workout.start()
+    for _ in range(4):
+        telemetry.record(POWER, 200)
+        clock.advance(3)
+
+    assert [row['index'] for row in telemetry.summary()] == [2, 3]
+
+
+def test_write_summary(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    telemetry = Telemetry(workout)
+    workout.start()
+    telemetry.record(HEART_RATE, 130)
+    stream = StringIO()
+    telemetry.write_summary(stream)
+
+    assert stream.getvalue().count('\n') == 1
+    assert '"heart_rate": {"samples": 1' in stream.getvalue()
+
+
+def test_encode_parse():
+    samples = [(HEART_RATE, 120.5), (POWER, 250.0)]
+
+    assert parse(encode(samples)) == samples
+    # Trailing partial samples and unknown channels are ignored
+    assert parse(encode(samples + [(200, 1.0)]) + b'\x00') == samples
+
+
+def test_receiver(test_data, tmp_path, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    telemetry = Telemetry(workout)
+    workout.start()
+    path = str(tmp_path / 'sensors')
+    receiver = Receiver(telemetry, path=path)
+    receiver.start()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        for value in (100, 200, 300):
+            sender.sendto(encode([(POWER, value)]), path)
+
+    deadline = time.monotonic() + 5
+    while receiver.received < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    receiver.stop()
+
+    assert receiver.received == 3
+    assert telemetry.latest(POWER) == 300
+    assert telemetry.aggregates(0)[POWER].count == 3
+    assert not (tmp_path / 'sensors').exists()
@@ -0,0 +1,116 @@
+import csv
+import pytest
+from qintervals import timeline
+from qintervals.block import Block
+from qintervals.interval import Interval, IntervalType
+from qintervals.simulation import simulate
+from qintervals.workout import Workout
+
+# Build timelines with NumPy when it is installed and always without
+BACKENDS = [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        timeline.numpy is None, reason='NumPy is not installed'))
+]
+
+
+@pytest.fixture(params=BACKENDS, ids=['array', 'numpy'])
+def use_numpy(request):
+    return request.param
+
+
+@pytest.mark.parametrize('workout_file', ['basic.yml', 'nested_blocks.yml'])
+def test_matches_simulation(test_data, workout_file, use_numpy):
+    workout = Workout(test_data+'/'+workout_file)
+    samples = simulate(workout, sample_rate=2).samples
+    result = timeline.timeline(workout.schedule, 0.5, use_numpy)
+
+    assert len(result.elapsed) == len(samples)
+    for i, sample in enumerate(samples):
+        assert result.index[i] == sample.index
+        assert result.interval_type[i] == \
+            workout.intervals[sample.index].interval_type.value
+        for field in ('elapsed', 'remaining', 'interval_elapsed',
+                      'interval_remaining'):
+            assert getattr(result, field)[i] == \
+                pytest.approx(getattr(sample, field))
+
+
+def test_skip_last_rest(use_numpy):
+    work = Interval(IntervalType.work, 'Work', '2s')
+    rest = Interval(IntervalType.rest, 'Rest', '1s')
+    schedule = Block([Block([work, rest], 3, skip_last_rest=True)])
+    result = timeline.timeline(schedule, 1, use_numpy)
+
+    assert list(result.index) == [0, 0, 1, 2, 2, 3, 4, 4]
+    assert list(result.remaining)[-1] == 1
+
+
+def test_workout_timeline(test_data):
+    workout = Workout(test_data+'/basic.yml')
+    result = workout.timeline()
+
+    assert list(result.index) == [0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+
+def test_empty(use_numpy):
+    result = timeline.timeline(Block(), 1, use_numpy)
+
+    assert len(result.elapsed) == 0
+
+
+def test_invalid_resolution():
+    with pytest.raises(ValueError):
+        timeline.timeline(Block(), 0)
+
+
+def test_write_csv(test_data, tmp_path):
+    result = Workout(test_data+'/basic.yml').timeline()
+    path = str(tmp_path / 'timeline.csv')
+    timeline.export(result, path)
+
+    with open(path, newline='') as stream:
+        rows = list(csv.DictReader(stream))
+    assert len(rows) == 12
+    assert rows[4]['index'] == '1'
+    assert rows[4]['interval_type'] == 'work'
+    assert float(rows[4]['interval_elapsed']) == 1
+
+
+def test_write_npz(test_data, tmp_path):
+    numpy = pytest.importorskip('numpy')
+    result = Workout(test_data+'/basic.yml').timeline()
+    path = str(tmp_path / 'timeline.npz')
+    timeline.export(result, path)
+
+    with numpy.load(path) as archive:
+        assert list(archive['index']) == list(result.index)
+        assert archive['type_names'][archive['interval_type'][4]] == 'work'
+
+
+@pytest.mark.parametrize('extension,module', [
+    ('.arrow', 'pyarrow.feather'), ('.parquet', 'pyarrow.parquet')])
+def test_write_arrow(test_data, tmp_path, extension, module):
+    reader = pytest.importorskip(module)
+    result = Workout(test_data+'/basic.yml').timeline()
+    path = str(tmp_path / ('timeline' + extension))
+    timeline.export(result, path)
+
+    table = reader.read_table(path)
+    assert table.column('index').to_pylist() == list(result.index)
+    assert table.column('interval_type').to_pylist()[4] == 'work'
+
+
+def test_npz_without_numpy(test_data, tmp_path, monkeypatch):
+    result = Workout(test_data+'/basic.yml').timeline()
+    monkeypatch.setattr(timeline, 'numpy', None)
+
+    with pytest.raises(timeline.ExportError):
+        timeline.export(result, str(tmp_path / 'timeline.npz'))
+
+
+def test_unknown_format(test_data, tmp_path):
+    result = Workout(test_data+'/basic.yml').timeline()
+
+    with pytest.raises(timeline.ExportError):
+        timeline.export(result, str(tmp_path / 'timeline.txt'))
@@ -1,27 +1,29 @@
 import pytest
-from qintervals.workout import Workout, WorkoutState
-from time import sleep
+from qintervals.clock import to_ns
+from qintervals.interval import Interval, IntervalType
+from qintervals.workout import (Workout, WorkoutState, MalformedWorkoutError,
+                                describe_error)
 
-TOLERANCE = 1e-3
+TOLERANCE = 1e-9
 
 
 def approx_time(value):
     return pytest.approx(value, abs=TOLERANCE)
 
 
-def test_start(test_data):
-    workout = Workout(test_data+'/basic.yml')
+def test_start(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
 
     assert workout.current_interval() == workout.intervals[0]
     assert workout.elapsed() == approx_time(0.01)
 
 
-def test_transition(test_data):
-    workout = Workout(yaml_file=test_data+'/quick.yml')
+def test_transition(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/quick.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
 
     progress = workout.progress()
 
@@ -29,59 +31,59 @@ def test_transition(test_data):
     assert progress.changed_interval
 
 
-def test_ending(test_data):
-    workout = Workout(yaml_file=test_data+'/quick.yml')
+def test_ending(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/quick.yml', clock=clock)
     workout.start()
-    sleep(0.03)
+    clock.advance(0.03)
 
     workout.progress()
 
     assert workout.state == WorkoutState.stopped
 
 
-def test_pause(test_data):
-    workout = Workout(yaml_file=test_data+'/basic.yml')
+def test_pause(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/basic.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
     workout.pause()
-    sleep(0.01)
+    clock.advance(0.01)
 
     assert workout.state == WorkoutState.paused
     assert workout.elapsed() == approx_time(0.01)
 
 
-def test_resume(test_data):
-    workout = Workout(yaml_file=test_data+'/basic.yml')
+def test_resume(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/basic.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
     workout.pause()
-    sleep(0.01)
+    clock.advance(0.01)
     workout.start()
 
-    assert workout.time_paused == approx_time(0.01)
+    assert workout.time_paused == to_ns(0.01)
     assert workout.state == WorkoutState.running
 
 
-def test_start_pause(test_data):
-    workout = Workout(yaml_file=test_data+'/basic.yml')
+def test_start_pause(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/basic.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
     workout.start_pause()
-    sleep(0.01)
+    clock.advance(0.01)
 
     assert workout.state == WorkoutState.paused
     assert workout.elapsed() == approx_time(0.01)
 
     workout.start_pause()
 
-    assert workout.time_paused == approx_time(0.01)
+    assert workout.time_paused == to_ns(0.01)
     assert workout.state == WorkoutState.running
 
 
-def test_progress(test_data):
-    workout = Workout(yaml_file=test_data+'/quick.yml')
+def test_progress(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/quick.yml', clock=clock)
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
 
     progress = workout.progress()
 
@@ -97,12 +99,244 @@ def test_progress(test_data):
     assert progress.changed_interval is False
 
 
-def test_upcoming(test_data):
-    workout = Workout(yaml_file=test_data+'/quick.yml')
+def test_upcoming(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/quick.yml', clock=clock)
 
     assert workout.upcoming() == workout.intervals[1:]
 
     workout.start()
-    sleep(0.01)
+    clock.advance(0.01)
 
     assert workout.upcoming() == workout.intervals[2:]
+
+
+def test_current_interval_lookup(clock):
+    workout = Workout(clock=clock)
+    for length in ['1s', '2s', '3s', '4s']:
+        workout.add_interval(Interval(IntervalType.work, length, length))
+    workout.start()
+
+    for elapsed, index in [(0.5, 0), (1.5, 1), (2.9, 1), (3.0, 2), (9.9, 3),
+                           (0.5, 0)]:
+        clock.set(elapsed)
+        assert workout.current_interval() is workout.intervals[index]
+        workout.progress()
+
+    clock.set(10.5)
+    assert workout.current_interval() is None
+
+
+def test_progress_record_reused(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/basic.yml', clock=clock)
+    workout.start()
+
+    assert workout.progress() is workout.progress()
+
+
+def test_upcoming_limit(test_data):
+    workout = Workout(yaml_file=test_data+'/nested_blocks.yml')
+
+    assert workout.upcoming(limit=3) == workout.intervals[1:4]
+    assert workout.upcoming(limit=100) == workout.intervals[1:]
+    assert list(workout.iter_upcoming()) == workout.intervals[1:]
+
+
+def test_many_pauses(test_data, clock):
+    workout = Workout(yaml_file=test_data+'/basic.yml', clock=clock)
+    workout.start()
+    for _ in range(10000):
+        clock.advance(0.0001)
+        workout.pause()
+        clock.advance(0.0003)
+        workout.start()
+
+    assert workout.time_paused == 10000*to_ns(0.0003)
+    assert workout.elapsed() == approx_time(1.0)
+
+
+def test_shared_plan(test_data, clock):
+    workout = Workout(test_data+'/basic.yml', clock=clock)
+    shared = Workout(plan=workout.plan, clock=clock)
+    workout.start()
+    clock.advance(3)
+
+    assert shared.state == WorkoutState.stopped
+    assert shared.total_time == workout.total_time
+    assert shared.current_interval() is workout.intervals[0]
+
+
+def test_add_to_shared_plan(test_data):
+    workout = Workout(test_data+'/basic.yml')
+    plan = workout.plan
+    workout.add_interval(Interval(IntervalType.work, 'Extra', '10s'))
+
+    assert plan.frozen
+    assert workout.plan is not plan
+    assert len(workout.intervals) == len(plan.intervals) + 1
+
+
+def test_boundary(test_data, clock):
+    workout = Workout(test_data+'/block.yml', clock=clock)
+    assert workout.boundary() is None
+
+    clock.set(10)
+    workout.start()
+    clock.advance(4)
+    assert workout.boundary() == to_ns(16)
+
+    workout.pause()
+    assert workout.boundary() is None
+    clock.advance(1)
+    workout.start()
+    assert workout.boundary() == to_ns(17)
+
+
+def test_seek(test_data, clock):
+    workout = Workout(test_data+'/block.yml', clock=clock)
+    workout.start()
+    clock.advance(1)
+    workout.seek(7.5)
+
+    assert workout.state == WorkoutState.running
+    assert workout.elapsed() == approx_time(7.5)
+    assert workout.current_position().index == 2
+
+    clock.advance(1)
+    progress = workout.progress()
+    assert progress.elapsed == approx_time(8.5)
+    assert not progress.changed_interval
+
+
+def test_seek_paused(test_data, clock):
+    workout = Workout(test_data+'/block.yml', clock=clock)
+    workout.start()
+    clock.advance(5)
+    workout.pause()
+    clock.advance(2)
+    workout.seek(1)
+    clock.advance(2)
+
+    assert workout.elapsed() == approx_time(1)
+    assert workout.time_paused == 0
+
+    workout.start()
+    clock.advance(1)
+    assert workout.elapsed() == approx_time(2)
+    assert workout.time_paused == to_ns(4)
+
+
+def test_seek_stopped(test_data, clock):
+    workout = Workout(test_data+'/block.yml', clock=clock)
+    workout.seek(4)
+
+    assert workout.state == WorkoutState.paused
+    assert workout.elapsed() == approx_time(4)
+
+
+def test_seek_end(test_data, clock):
+    workout = Workout(test_data+'/block.yml', clock=clock)
+    workout.start()
+    workout.seek(1000)
+
+    assert workout.progress().changed_interval
+    assert workout.state == WorkoutState.stopped
+
+
+def test_skip_interval(test_data, clock):
+    workout = Workout(test_data+'/nested_blocks.yml', clock=clock)
+    workout.start()
+    clock.advance(4)
+
+    workout.skip_interval(3)
+    assert workout.current_position().index == 4
+    assert workout.elapsed() >= workout.timing(4).starts_at
+
+    workout.skip_interval(-2)
+    assert workout.current_position().index == 2
+
+    clock.advance(1)
+    workout.skip_interval(0)
+    assert workout.elapsed() == approx_time(workout.timing(2).starts_at)
+
+    workout.skip_interval(-10)
+    assert workout.elapsed() == 0
+
+
+def test_jump_to_block(test_data, clock):
+    workout = Workout(test_data+'/nested_blocks.yml', clock=clock)
+    workout.start()
+    workout.jump_to_block(0)
+
+    assert workout.current_position().index == 2
+    assert workout.elapsed() == approx_time(6)
+    with pytest.raises(IndexError):
+        workout.jump_to_block(1)
+
+
+def test_iter_upcoming_runs(test_data, clock):
+    workout = Workout(test_data+'/nested_blocks.yml', clock=clock)
+    runs = list(workout.iter_upcoming_runs())
+
+    assert [(run.repeats, run.index, run.count) for run in runs] == [
+        (1, 1, 1), (2, 2, 10)]
+    assert runs[1].entry is workout.schedule.entries[2]
+
+    workout.start()
+    clock.set(10)
+    runs = list(workout.iter_upcoming_runs())
+    assert [(run.repeats, run.index, run.count) for run in runs] == [
+        (1, 4, 1), (1, 5, 1), (1, 6, 1), (1, 7, 1), (2, 8, 4)]
+    assert sum(run.count for run in runs) == len(workout.upcoming())
+
+
+def test_iter_upcoming_runs_merged(clock):
+    workout = Workout(clock=clock)
+    for _ in range(3):
+        workout.add_interval(Interval(IntervalType.work, 'Work', '10s'))
+    workout.add_interval(Interval(IntervalType.rest, 'Rest', '10s'))
+
+    runs = list(workout.iter_upcoming_runs())
+    assert [(run.repeats, run.index, run.count) for run in runs] == [
+        (2, 1, 2), (1, 3, 1)]
+
+
+@pytest.mark.parametrize('intervals,message', [
+    ('  - block:\n      repeats: two\n      intervals: []\n',
+     'Block "repeats" is not a whole number'),
+    ('  - block:\n      repeats: 2\n      intervals: work\n',
+     'Block "intervals" is not a list'),
+    ('  - Work\n', 'Entry is not a mapping'),
+    ('  - type: work\n    name: Work\n    length: 10\n',
+     'Interval "length" is not a number'),
+    ('  - type: work\n    name: Work\n    length: tens\n',
+     'Interval "length" is not a number'),
+    ('  Work\n', 'Workout file "intervals" is not a list')
+])
+def test_malformed(tmp_path, intervals, message):
+    workout_file = tmp_path / 'malformed.yml'
+    workout_file.write_text('title: Bad\nintervals:\n' + intervals)
+
+    with pytest.raises(MalformedWorkoutError) as error:
+        Workout(str(workout_file))
+    assert describe_error(error.value).startswith(message)
+
+
+def test_describe_error():
+    assert describe_error(OSError('Missing')) == 'Missing'
+    assert describe_error(MalformedWorkoutError()) == 'MalformedWorkoutError'
+
+
+def test_progress_from_yaml(test_data):
+    workout = Workout()
+    workout.from_yaml(test_data+'/basic.yml')
+
+    assert workout.progress().interval is workout.intervals[0]
+
+
+def test_progress_added_intervals():
+    workout = Workout()
+    workout.add_interval(Interval(IntervalType.work, 'Work', '3s'))
+
+    progress = workout.progress()
+    assert progress.interval is workout.intervals[0]
+    assert progress.remaining == 3
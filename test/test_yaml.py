@@ -63,3 +63,58 @@ class TestMissingKeyError(object):
     def test_block_missing_intervals(self, test_data):
         with pytest.raises(MissingKeyError):
             Workout(yaml_file=test_data+'/block_missing_intervals.yml')
+
+
+def test_yaml_stream(test_data):
+    with open(test_data+'/block.yml', 'rb') as stream:
+        workout = Workout(yaml_file=stream)
+
+    assert len(workout.intervals) == 6
+
+
+def test_yaml_dict():
+    workout = Workout(yaml_file={
+        'title': 'Dict',
+        'intervals': [{'type': 'work', 'name': 'One', 'length': '1m'}]})
+
+    assert workout.name == 'Dict'
+    assert workout.total_time == 60
+
+
+def test_load_times(test_data):
+    workout = Workout(yaml_file=test_data+'/basic.yml')
+
+    assert workout.load_times.parse > 0
+    assert workout.load_times.unpack > 0
+    assert workout.load_times.index > 0
+
+
+def test_iter_yaml(test_data):
+    workout = Workout()
+    loading = workout.iter_yaml(test_data+'/nested_blocks.yml')
+    next(loading)
+
+    assert workout.name == 'Block Test'
+    assert len(workout.intervals) == 1
+
+    for entry in loading:
+        pass
+
+    expected = Workout(yaml_file=test_data+'/nested_blocks.yml')
+    assert [interval.text for interval in workout.intervals] == [
+        interval.text for interval in expected.intervals]
+    assert workout.total_time == expected.total_time
+
+
+class TestIterYamlErrors(object):
+    def test_invalid_yaml(self, test_data):
+        with pytest.raises(WorkoutFileError):
+            list(Workout().iter_yaml(test_data+'/invalid_yaml.yml'))
+
+    def test_missing_title_key(self, test_data):
+        with pytest.raises(MissingKeyError):
+            list(Workout().iter_yaml(test_data+'/missing_title.yml'))
+
+    def test_missing_intervals(self, test_data):
+        with pytest.raises(MissingKeyError):
+            list(Workout().iter_yaml(test_data+'/missing_intervals.yml'))